@@ -16,6 +16,20 @@ import re
 import itertools
 import colorama
 import functools
+import collections.abc
+import concurrent.futures
+import hashlib
+import pickle
+import subprocess
+import threading
+import signal
+import multiprocessing
+import tempfile
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
 
 # Ensure colored output on win32 platforms
 colorama.init()
@@ -91,6 +105,17 @@ WIKI_FIXUP_AUTHOR_NAME = "Wiki converter"
 WIKI_FIXUP_AUTHOR_EMAIL = "none@localhost"
 WIKI_FIXUP_MESSAGE = "Updated Wiki to GitHub formatting"
 WIKI_UNKNOWN_EMAIL = "none@localhost"
+WIKI_VERSION_TRAILER = "Assembla-Wiki-Version"
+
+# Settings for the Assembla API used by the scrape commands. The API URL can be
+# overridden with 'api_url' in the config file.
+ASSEMBLA_API_URL = "https://api.assembla.com/v1"
+ASSEMBLA_API_PER_PAGE = 100
+ASSEMBLA_API_RATE = 10  # Requests per second
+ASSEMBLA_API_WORKERS = 4
+ASSEMBLA_API_RETRIES = 5
+ASSEMBLA_API_BACKOFF = 0.5  # Seconds before first retry, doubled for each retry
+ASSEMBLA_API_TIMEOUT = 30  # Seconds to wait for the connection and for each read
 
 # URLs to replace when converting Wiki
 URL_RE_REPLACE = [
@@ -113,9 +138,51 @@ URL_RE_REPLACE_TICKETS = [
     (r'^https?://(www|app)\.assembla\.com/spaces/{ASSEMBLA_SPACE}/tickets/(\d+)$', r'#\2'),
     (r'^https?://(www|app)\.assembla\.com/spaces/{ASSEMBLA_SPACE}/wiki/(.*)$', r'[\2](../wiki/\2)'),
 ]
-_URL_RE = []
-_URL_RE_WIKI = []
-_URL_RE_TICKETS = []
+
+# Columns in the Assembla tables that refer to users
+USER_COLUMNS = ('user_id', 'created_by', 'updated_by', 'reporter_id', 'assigned_to_id')
+
+# Tables read from the dump file by the wiki and ticket commands. Rows of other
+# tables are skipped when parsing.
+WIKI_TABLES = {
+    'wiki_pages', 'wiki_page_versions',
+    # Space members, to find all users for the '_users' table
+    'user_roles',
+}
+TICKET_TABLES = WIKI_TABLES | {
+    'tickets', 'ticket_comments', 'ticket_changes', 'ticket_statuses', 'ticket_tags', 'tag_names',
+    'milestones', 'workflow_property_vals', 'workflow_property_defs', 'documents',
+}
+
+# Fields with often repeated values which are interned when parsing. All fields
+# ending in '_id' are interned as well. Longer values are not interned.
+INTERN_FIELDS = {
+    'created_by', 'updated_by', 'subject', 'before', 'after', 'name', 'title',
+}
+INTERN_MAX_LENGTH = 64
+
+# Maximum size of the byte ranges of the dump file used for --parse-jobs
+PARSE_RANGE_SIZE = 16 * 1024 * 1024
+
+# Tickets converted per task, and tasks queued per process with --jobs
+TICKET_JOB_CHUNK = 16
+TICKET_JOB_BACKLOG = 4
+
+# Converted tickets waiting for upload in ticketsconvert
+TICKET_UPLOAD_BACKLOG = 16
+
+# Default directory for the parsed dataset cache and the scrape HTTP cache. Can be
+# set with 'cachedir' in config
+CACHE_DIR = '.assembla2github-cache'
+HTTP_CACHE_SUBDIR = 'http'
+MARKDOWN_CACHE_FILE = 'markdown.pickle'
+MARKDOWN_CACHE_SIZE = 64 * 1024 * 1024  # Max characters of cached conversions
+
+# Max seconds for the markdown conversion of one text. Texts exceeding it, or
+# having more unclosed [[, ](, <pre> or {{{ than MARKDOWN_MAX_UNCLOSED, get the
+# simple linear time conversion instead.
+MARKDOWN_TIME_BUDGET = 2
+MARKDOWN_MAX_UNCLOSED = 100
 
 # Polling exponential delay
 POLL_INITIAL = 0.1
@@ -132,6 +199,26 @@ class Unset(metaclass=UnsetMeta):
     """ Unset class """
 
 
+class DumpSyntaxError(Exception):
+    """ Unparseable line in the Assembla dump file """
+
+
+class MissingValue(KeyError):
+    """
+    Lazy RELATIONS field without a value for the row, such as the completed
+    date of an open ticket. Other errors of the relations, such as references
+    to missing rows, are raised as they are.
+    """
+
+
+class MarkdownTimeout(BaseException):
+    """
+    Markdown conversion exceeded its time budget. It is raised from the SIGALRM
+    handler at any point of the conversion, so it must not be caught by the
+    'except Exception' handlers, such as in the logging handlers.
+    """
+
+
 # Inheriting dict isn't recommended, but this is a small mixin so it is probably ok for this use
 class DictPlus(dict):
     """ dict mixin class with extra convenience methods """
@@ -141,6 +228,158 @@ class DictPlus(dict):
             return self['_index'][table][id]
         return self['_index'][table].get(id, default)
 
+    def bindrelations(self):
+        """ Resolve the RELATIONS fields of the rows from this dataset """
+        for layout in _ROWLAYOUTS.values():
+            layout.relations = RELATIONS.get(layout.table, {})
+            layout.data = self
+
+    def findall(self, table, column, value):
+        """ Return the list of rows in table where column equals value. The
+            column must be grouped by groupassembladata(). The returned list
+            must not be modified.
+        """
+        return self['_groups'][table][column].get(value, [])
+
+    def findby(self, table, column, value, default=None):
+        """ Return the row in table where the non-primary column equals value.
+            The column is indexed on first use. If the value is not unique in
+            the table, the first row is returned.
+        """
+        columns = self.setdefault('_keys', {}).setdefault(table, {})
+        index = columns.get(column)
+        if index is None:
+            index = {}
+            duplicates = set()
+            for v in self[table]:
+                key = v.get(column, Unset)
+                if key is Unset:
+                    continue
+                if key in index:
+                    duplicates.add(key)
+                    continue
+                index[key] = v
+            if duplicates:
+                logging.warning(f"Non unique {column} in table '{table}': {', '.join(sorted(map(str, duplicates)))}")
+            columns[column] = index
+        return index.get(value, default)
+
+
+class RowLayout:
+    """ Field layout and relations shared by all rows of an Assembla table """
+    __slots__ = ('table', 'fields', 'index', 'intern', 'relations', 'data')
+
+    def __init__(self, table, fields):
+        self.table = table
+        self.fields = fields
+        self.index = {k: i for i, k in enumerate(fields)}
+        # Fields which contain often repeated values that should be interned
+        self.intern = frozenset(
+            i for i, k in enumerate(fields) if k.endswith('_id') or k in INTERN_FIELDS
+        )
+        # Set by DictPlus.bindrelations()
+        self.relations = {}
+        self.data = None
+
+    def __reduce__(self):
+        # Unpickle into the shared layout object of the receiving process
+        return (rowlayout, (self.table, self.fields))
+
+
+# All row layouts in this process, indexed by (table, fields)
+_ROWLAYOUTS = {}
+
+
+def rowlayout(table, fields):
+    """ Return the shared RowLayout object for the table and tuple of fields """
+    layout = _ROWLAYOUTS.get((table, fields))
+    if layout is None:
+        layout = _ROWLAYOUTS[(table, fields)] = RowLayout(table, fields)
+    return layout
+
+
+class AssemblaRow(collections.abc.MutableMapping):
+    """
+    Compact dict-like row of an Assembla table. The field values are stored in
+    a list ordered by the shared table layout instead of repeating the keys in
+    every row. Any other keys, such as the '_' fields added by the parsers, are
+    stored in a separate dict. Table fields cannot be deleted.
+
+    The '_' fields listed in RELATIONS for the table are resolved on first
+    access and stored in the row. They are not listed by keys() until then.
+    """
+    __slots__ = ('_layout', '_values', '_extra')
+
+    def __init__(self, layout, values):
+        self._layout = layout
+        self._values = values
+        self._extra = None
+
+    def __getitem__(self, key):
+        layout = self._layout
+        i = layout.index.get(key)
+        if i is not None:
+            return self._values[i]
+        extra = self._extra
+        if extra is not None and key in extra:
+            return extra[key]
+        relation = layout.relations.get(key)
+        if relation is None:
+            raise KeyError(key)
+        value = relation(layout.data, self)
+        self[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        i = self._layout.index.get(key)
+        if i is not None:
+            self._values[i] = value
+        elif self._extra is None:
+            self._extra = {key: value}
+        else:
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._layout.index:
+            raise TypeError(f"Cannot delete table field '{key}'")
+        if self._extra is None:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __contains__(self, key):
+        if key in self._layout.index or (self._extra is not None and key in self._extra):
+            return True
+        if key not in self._layout.relations:
+            return False
+        return self.get(key, Unset) is not Unset
+
+    def __iter__(self):
+        yield from self._layout.fields
+        if self._extra is not None:
+            yield from list(self._extra)
+
+    def __len__(self):
+        return len(self._values) + len(self._extra or ())
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def get(self, key, default=None):
+        i = self._layout.index.get(key)
+        if i is not None:
+            return self._values[i]
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        if key not in self._layout.relations:
+            return default
+        try:
+            return self[key]
+        except MissingValue:
+            return default
+
+    def copy(self):
+        return dict(self)
+
 
 def findfirst(fn, collection, default=None):
     """
@@ -226,9 +465,21 @@ def githubstate(state):
     return 'open' if state else 'closed'
 
 
+@functools.lru_cache(maxsize=8192)
+def isotime(text):
+    """ Convert ISO time string to datetime. Recently seen strings are cached """
+    return datetime.fromisoformat(text)
+
+
 def githubtime(date):
+    """ Convert datetime or ISO time string to GitHub time format """
     if not date:
         return date
+    if isinstance(date, str):
+        # Fast path for the UTC times used by Assembla
+        if len(date) == 25 and date[10] == 'T' and date.endswith('+00:00'):
+            return date[:19] + 'Z'
+        date = isotime(date)
     t = date.isoformat()
     if t.endswith('+00:00'):
         t = t.replace('+00:00','')
@@ -297,30 +548,77 @@ def printtable(data, keys=None, exclude=None, include=None, filter=None, slice=N
 
 def mapjsonlinetoassembblaobject(jsonstring, fieldlist, linenum, linetype):
     """
-    converts json string -> dict
+    converts json string -> dict-like AssemblaRow
     :param jsonstring: string array "['a', 123, ...]"
     :param fieldlist: expected ordered list of fields expected in json array
     :param linenum: current line num
     :param linetype: for the error message report if needed. tells us the type of line we are trying to read
-    :returns: a dict with the values from the jsonstring and the keys from the fieldlist
+    :returns: a dict-like AssemblaRow with the values from the jsonstring and the keys from the fieldlist
     """
     logging.debug('attempting to parse line #{0} as a {1}'.format(linenum, linetype))
     arr = json.loads(jsonstring)
+    return maparraytoassemblaobject(arr, fieldlist, linenum, linetype)
+
+
+def maparraytoassemblaobject(arr, fieldlist, linenum, linetype):
+    """
+    converts decoded json array -> dict-like AssemblaRow
+    :param arr: list of values
+    :param fieldlist: expected ordered list of fields expected in json array
+    :param linenum: current line num
+    :param linetype: for the error message report if needed. tells us the type of line we are trying to read
+    :returns: a dict-like AssemblaRow with the values from arr and the keys from the fieldlist
+    """
     if len(arr) != len(fieldlist):
         raise AssertionError('Assertion fail: {3} line [{0}] actual fields [{1}] != expected fields [{2}]'.format(linenum, len(arr), len(fieldlist), linetype))
-    return {field: value for field, value in zip(fieldlist, arr)}
+    layout = rowlayout(linetype, tuple(fieldlist))
+    for i in layout.intern:
+        v = arr[i]
+        if type(v) is str and len(v) <= INTERN_MAX_LENGTH:
+            arr[i] = sys.intern(v)
+    return AssemblaRow(layout, arr)
+
+
+def splitdumpline(line):
+    """
+    Split a line from the dump file into its table name and contents
+    :param line: line from the dump file
+    :returns: Tuple (table, fields, jsonstring). For ':fields,' lines fields
+              contains the list of field names and jsonstring is None. For table
+              entries fields is None and jsonstring contains the row data.
+    :raises DumpSyntaxError: If the line cannot be parsed
+    """
+
+    # Parse the field definition if present
+    fields = line.split(':fields, ')
+    if len(fields) > 2:
+        raise DumpSyntaxError(f"Unexpected field count in '{line}'")
+    if len(fields) > 1:
+        return (fields[0], json.loads(fields[1]), None)
 
+    # Parse the table entry
+    heading = line.split(', [')
+    if len(heading) < 2:
+        raise DumpSyntaxError(f"Unexpected syntax in '{line}'")
+    table = heading[0]
+    return (table, None, line.replace(table + ', ', '').strip())
 
-def filereadertoassemblaobjectgenerator(filereader, fieldmap):
+
+def filereadertoassemblaobjectgenerator(filereader, fieldmap, tables=None):
     """
     File reader to assembla object generator
-    :param filereader: File object which is read line by line
+    :param filereader: File object which is read line by line. The file is
+                       streamed in buffered chunks, so only the current line is
+                       kept in memory, regardless of the size of the file.
+    :param fieldmap: dict which will be updated with the table fields
+    :param tables: set of tables to parse. Rows of other tables are skipped
+                   without decoding them. Parse all tables if None.
     :returns: Generator which yields tuple (linenum, line, linetype, assemblaobject)
     """
 
     # for each line determine the assembla object type, read all attributes to dict using the mappings
     # assign a key for each object which is used to link github <-> assembla objects to support updates
-    for linenum, line in enumerate(filereader.readlines()):
+    for linenum, line in enumerate(filereader):
 
         # Remove all non printable characters from the line
         _line = line.rstrip()
@@ -330,31 +628,143 @@ def filereadertoassemblaobjectgenerator(filereader, fieldmap):
             logging.debug(f"line #{linenum}: Unprintable chars in '{line}'")
         logging.debug(f"line #{linenum}: {line}")
 
-        # Parse the field definition if present
-        fields = line.split(':fields, ')
-        if len(fields) > 2:
-            logging.error(f"line #{linenum}: Unexpected field count in '{line}'")
+        try:
+            table, fields, currentline = splitdumpline(line)
+        except DumpSyntaxError as err:
+            logging.error(f"line #{linenum}: {err}")
             continue
-        if len(fields) > 1:
-            key = fields[0]
-            fieldmap[key] = json.loads(fields[1])
+
+        # Store the field definition
+        if fields is not None:
+            fieldmap[table] = fields
             continue
 
-        # Parse the table entry
-        heading = line.split(', [')
-        if len(heading) < 2:
-            logging.error(f"line #{linenum}: Unexpected syntax in '{line}'")
+        if tables is not None and table not in tables:
             continue
-        table = heading[0]
         if table not in fieldmap:
-            logging.error("line #{linenum}: Table '{table}' not defined before '{line}'")
+            logging.error(f"line #{linenum}: Table '{table}' not defined before '{line}'")
             continue
-        currentline = line.replace(table + ', ', '').strip()
         row = mapjsonlinetoassembblaobject(currentline, fieldmap[table], linenum, table)
 
         yield (linenum, line, table, row)
 
 
+def dumpfileranges(filename, jobs, tables=None):
+    """
+    Split the dump file into byte ranges which start and end on line boundaries
+    :param filename: name of the dump file
+    :param jobs: number of worker processes. The file is split into at least this
+                 many ranges, and more if the ranges would exceed PARSE_RANGE_SIZE.
+    :param tables: set of tables to parse, passed on to the workers
+    :returns: List of tuples (filename, start, end, tables)
+    """
+    size = pathlib.Path(filename).stat().st_size
+    count = max(jobs, size // PARSE_RANGE_SIZE)
+    bounds = [0]
+    with open(filename, 'rb') as f:
+        for i in range(1, count):
+            pos = size * i // count
+            if pos <= bounds[-1]:
+                continue
+            # Move to the beginning of the next line
+            f.seek(pos - 1)
+            f.readline()
+            bounds.append(f.tell())
+    bounds.append(size)
+    return [(filename, start, end, tables) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def dumprangeparser(dumprange):
+    """
+    Parse the lines of a byte range in the dump file. This is the worker for
+    paralleldumpgenerator() and is run in a separate process.
+    :param dumprange: Tuple (filename, start, end, tables) as returned from dumpfileranges()
+    :returns: Tuple (lines, entries) where lines is the number of lines in the
+              range. entries is a list of tuples (linenum, table, fields, arr) with
+              linenum relative to the start of the range. For ':fields,' lines
+              fields is set and arr is None, for table entries arr contains the
+              decoded json array. Rows of tables not in tables are omitted.
+              Unparseable lines have table set to None and the error message in arr.
+    """
+    filename, start, end, tables = dumprange
+    entries = []
+    linenum = 0
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            raw = f.readline()
+            if not raw:
+                break
+            pos += len(raw)
+            line = raw.decode('utf8')
+            try:
+                table, fields, currentline = splitdumpline(line)
+                if fields is not None:
+                    entries.append((linenum, table, fields, None))
+                elif tables is None or table in tables:
+                    entries.append((linenum, table, None, json.loads(currentline)))
+            except DumpSyntaxError as err:
+                entries.append((linenum, None, None, str(err)))
+            linenum += 1
+    return (linenum, entries)
+
+
+def paralleldumpgenerator(filename, fieldmap, jobs, tables=None):
+    """
+    Parallel variant of filereadertoassemblaobjectgenerator(). The dump file is
+    split into byte ranges that are json decoded in a pool of processes. The
+    rows are produced in the same order as the serial generator, and the
+    ':fields,' definitions are resolved in file order across the ranges.
+    :param filename: name of the dump file
+    :param fieldmap: dict which will be updated with the table fields
+    :param jobs: number of worker processes
+    :param tables: set of tables to parse. Parse all tables if None.
+    :returns: Generator which yields tuple (linenum, line, linetype, assemblaobject).
+              The line text is not transferred from the workers, so line is None.
+    """
+    offset = 0
+
+    def rangerows(future):
+        nonlocal offset
+        lines, entries = future.result()
+        for linenum, table, fields, arr in entries:
+            linenum += offset
+
+            if table is None:
+                logging.error(f"line #{linenum}: {arr}")
+                continue
+
+            # Store the field definition
+            if fields is not None:
+                fieldmap[table] = fields
+                continue
+
+            if table not in fieldmap:
+                logging.error(f"line #{linenum}: Table '{table}' not defined")
+                continue
+            row = maparraytoassemblaobject(arr, fieldmap[table], linenum, table)
+
+            yield (linenum, None, table, row)
+
+        offset += lines
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        # Only a few ranges are parsed ahead, as each decoded range is held in
+        # memory until its rows are consumed
+        queue = collections.deque()
+        try:
+            for dumprange in dumpfileranges(filename, jobs, tables):
+                queue.append(executor.submit(dumprangeparser, dumprange))
+                if len(queue) > jobs:
+                    yield from rangerows(queue.popleft())
+            while queue:
+                yield from rangerows(queue.popleft())
+        finally:
+            for future in queue:
+                future.cancel()
+
+
 def indexassembladata(data, keymap):
     """
     Convert each table in data dict from list of rows to dict indexed by key
@@ -387,6 +797,156 @@ def indexassembladata(data, keymap):
     return index
 
 
+def groupassembladata(data, groupmap):
+    """
+    Group the rows of the tables in data by column value, for looking up the
+    rows referring to another table, e.g. all comments of a ticket.
+    :param data: Dict indexed by tablename containing list of rows
+    :param groupmap: A dict indexed by tablename containing the columns to group by
+    :returns: Dict indexed by tablename containing a dict indexed by column. Each
+              column contains a dict of lists of rows indexed by column value.
+    """
+
+    groups = {}
+    for table, columns in groupmap.items():
+
+        # Skip tables that has not been read
+        objects = data.get(table)
+        if objects is None:
+            continue
+
+        # Group the rows in a single pass over the table, keeping the row order
+        for column in columns:
+            group = groups.setdefault(table, {}).setdefault(column, {})
+            for v in objects:
+                group.setdefault(v[column], []).append(v)
+
+    return groups
+
+
+def belongsto(column, table, default=Unset):
+    """ Relation to the row in table with the primary key given by column """
+    return lambda data, v: data.find(table, v[column], default)
+
+
+def timefield(column):
+    """ Relation converting the ISO time string in column to datetime """
+    return lambda data, v: isotime(v[column])
+
+
+def completeddate(data, v):
+    """ Relation to the completed date of closed tickets. Missing on open tickets """
+    if v['state']:
+        raise MissingValue('_completed_date')
+    return isotime(v['completed_date'])
+
+
+def hasmany(table, column):
+    """ Relation to the rows in table where column refers to the row id """
+    return lambda data, v: data.findall(table, column, v['id'])
+
+
+def ticketworkflow(data, v):
+    """ Relation collecting the component and keywords workflow values of a ticket """
+    workflow = {}
+    for wf in data.findall('workflow_property_vals', 'workflow_instance_id', v['id']):
+        t = wf['_type'].lower()
+        if t == 'keywords':
+            # Split keywords into distinct words
+            workflow.setdefault(t, set()).update(wf['value'].split(' '))
+        elif t == 'component':
+            workflow.setdefault(t, set()).add(wf['value'])
+        else:
+            logging.warning(f"Unknown workflow name '{t}' on ticket {v['id']}")
+    return workflow
+
+
+def workflowvalue(name):
+    """ Relation to the workflow values of a ticket. Missing if it has none """
+    def relation(data, v):
+        workflow = v['_workflow']
+        if name not in workflow:
+            raise MissingValue('_' + name)
+        return workflow[name]
+    return relation
+
+
+def ticketchangevalue(field):
+    """ Relation to the object referred by the before or after field of a ticket change """
+    def relation(data, v):
+        subject = v['subject']
+        if subject == 'status':
+            name, ref = 'ticket status', data.findby('ticket_statuses', 'name', v[field])
+        elif subject == 'milestone_id':
+            name, ref = 'milestone', data.findby('milestones', 'title', v[field])
+        elif subject == 'assigned_to_id':
+            name, ref = 'user', data.findby('_users', 'login', v[field])
+        else:
+            raise MissingValue('_' + field)
+        if v[field] and not ref:
+            logging.warning(f"Uknown {name} '{v[field]}' on ticket change {v['id']} in ticket #{v['_comment']['_ticket']['number']}")
+        return ref
+    return relation
+
+
+# Lazy '_' fields of the Assembla tables. Each relation is a function
+# fn(data, row) that is called on the first access of the field. It raises
+# MissingValue if the field has no value for the row.
+RELATIONS = {
+    'wiki_pages': {
+        '_user': belongsto('user_id', '_users'),
+        '_created_at': timefield('created_at'),
+        '_updated_at': timefield('updated_at'),
+    },
+    'wiki_page_versions': {
+        '_wiki_page': belongsto('wiki_page_id', 'wiki_pages'),
+        '_user': belongsto('user_id', '_users'),
+        '_created_at': timefield('created_at'),
+        '_updated_at': timefield('updated_at'),
+    },
+    'ticket_tags': {
+        '_tag_name': belongsto('tag_name_id', 'tag_names'),
+    },
+    'workflow_property_vals': {
+        '_type': lambda data, v: data.find('workflow_property_defs', v['workflow_property_def_id'])['title'],
+    },
+    'ticket_comments': {
+        '_ticket': belongsto('ticket_id', 'tickets'),
+        '_changes': hasmany('ticket_changes', 'ticket_comment_id'),
+        '_user': belongsto('user_id', '_users'),
+        '_created_on': timefield('created_on'),
+        '_updated_at': timefield('updated_at'),
+    },
+    'ticket_changes': {
+        '_comment': belongsto('ticket_comment_id', 'ticket_comments'),
+        '_created_at': timefield('created_at'),
+        '_updated_at': timefield('updated_at'),
+        '_before': ticketchangevalue('before'),
+        '_after': ticketchangevalue('after'),
+    },
+    'tickets': {
+        '_created_on': timefield('created_on'),
+        '_updated_at': timefield('updated_at'),
+        '_completed_date': completeddate,
+        '_milestone': belongsto('milestone_id', 'milestones', None),
+        '_milestone_text': lambda data, v: dig(v, '_milestone', 'title'),
+        '_ticket_status': belongsto('ticket_status_id', 'ticket_statuses'),
+        '_reporter': belongsto('reporter_id', '_users'),
+        '_assigned_to': belongsto('assigned_to_id', '_users', None),
+        '_state': lambda data, v: githubstate(v['state']),
+        '_priority': lambda data, v: ASSEMBLA_PRIORITY_MAPPING[v['priority']],
+        '_status': lambda data, v: v['_ticket_status']['name'],
+        '_tags': lambda data, v: set([
+            x['_tag_name']['name'] for x in data.findall('ticket_tags', 'ticket_id', v['id'])
+        ]) or None,
+        '_comments': hasmany('ticket_comments', 'ticket_id'),
+        '_workflow': ticketworkflow,
+        '_keywords': workflowvalue('keywords'),
+        '_component': workflowvalue('component'),
+    },
+}
+
+
 def wikiparser(data):
     """
     Parse the wiki tables
@@ -405,13 +965,6 @@ def wikiparser(data):
         # v['_parent'] = data.find('wiki_pages', v['parent_id'], None)
         v.setdefault('_children', [])
 
-        # Add the reference to the user
-        v['_user'] = data.find('_users', v['user_id'])
-
-        # Convert dates
-        v['_created_at'] = datetime.fromisoformat(v['created_at'])
-        v['_updated_at'] = datetime.fromisoformat(v['updated_at'])
-
         # Append element to the wiki directory list
         parent = v['parent_id']
         wikitree.setdefault(parent, [])
@@ -435,20 +988,10 @@ def wikiparser(data):
     # wiki_page_versions
     # ==================
     #   change_comment, contents, created_at, id, updated_at, user_id, version, wiki_page_id
-    for v in data['wiki_page_versions']:
-
-        # Add reference to the blob
-        # v['_blob_id'] = data.find('wiki_page_blobs', v['id']).get('blob_id')
-
-        # Add reference to the wiki page object
-        v['_wiki_page'] = data.find('wiki_pages', v['wiki_page_id'])
-
-        # Add the user
-        v['_user'] = data.find('_users', v['user_id'])
-
-        # Convert dates
-        v['_created_at'] = datetime.fromisoformat(v['created_at'])
-        v['_updated_at'] = datetime.fromisoformat(v['updated_at'])
+    #
+    # The references and dates are resolved on access, as declared in RELATIONS.
+    # Reference to the blob:
+    #   v['_blob_id'] = data.find('wiki_page_blobs', v['id']).get('blob_id')
 
     # DEBUG
     # printtable(data['wiki_page_versions'], include=('_blob_id', ))
@@ -474,7 +1017,7 @@ def mergewikidata(wikidata, wiki_page_versions):
     # Data is arranged as [PAGE1,PAGE2,...] where PAGE is [VER1,VER2,...]
     # which itertools.chain() will flatten
     count = 0
-    for v in itertools.chain(*wikidata):
+    for v in itertools.chain.from_iterable(wikidata):
         count += 1
         # Get the corresponding wiki page data from the dump
         w = wiki_page_versions.get(v['id'])
@@ -521,21 +1064,39 @@ def mergewikidata(wikidata, wiki_page_versions):
     logging.info(f"    Found {count} wiki page entries")
 
 
-def wikicommitgenerator(wikiversions, order):
+def wikicommitgenerator(wikiversions, order, skip=None):
     """
-    A generator producing a dict of git commits data containing wiki edits
+    A generator producing a dict of git commits data containing wiki edits.
+    The 'readme.md' menu is only included in the commits where the set of
+    present wiki pages changes.
+    :param skip: set of wiki page version ids which have already been
+                 converted and shall not produce any commits
     """
 
     # Collect all the latest current versions of the wiki pages
     pages = {}
     missing_authors = set()
 
+    # The wiki pages in the menu in order of creation. As time only advances,
+    # the set of present pages only grows from the front of this list.
+    pending = sorted((w for w in order if w['status'] == 1), key=lambda w: w['_created_at'])
+    npresent = 0
+    present = set()
+    menu = None
+    menuchanged = False
+
     for v in sorted(wikiversions, key=lambda v: v['_updated_at']):
         p = v['_wiki_page']
         now = v['_updated_at']
 
-        # Make ordered list of wiki pages that are present at this time
-        indexpages = filter(lambda w: w['_created_at'] <= now and w['status'] == 1, order)
+        # Add the wiki pages that are present at this time
+        while npresent < len(pending) and pending[npresent]['_created_at'] <= now:
+            present.add(pending[npresent]['id'])
+            npresent += 1
+            menu = None
+        if menu is None:
+            menu = wikiindexproducer(w for w in order if w['id'] in present)
+            menuchanged = True
 
         fname = 'pages/' + p['page_name'] + '.md'
         author = v['_user']
@@ -547,13 +1108,21 @@ def wikicommitgenerator(wikiversions, order):
 
         pages[fname] = v['contents'] or None
 
+        if skip and v['id'] in skip:
+            continue
+
+        # The menu is carried over to the next commit if its version is skipped
+        files = {}
+        if menuchanged:
+            files['readme.md'] = menu
+            menuchanged = False
+        files[fname] = v['contents'] or None
+
         yield {
+            'id': v['id'],
             'name': p['page_name'],
             'version': p['version'],
-            'files': {
-                'readme.md': wikiindexproducer(indexpages),
-                fname: v['contents'] or None,
-            },
+            'files': files,
             'author_name': nameorid(author),
             'author_email': author.get('email', WIKI_UNKNOWN_EMAIL),
             'message': v['change_comment'] or '',
@@ -575,6 +1144,7 @@ def wikicommitgenerator(wikiversions, order):
 
     if files:
         yield {
+            'id': None,
             'name': 'ALL',
             'version': None,
             'pages': pages,
@@ -590,44 +1160,119 @@ def wikicommitgenerator(wikiversions, order):
 def wikiindexproducer(index):
     """ Produce the index menu """
 
-    out = f'''{WIKI_MENU_HEADING}
+    out = [f'''{WIKI_MENU_HEADING}
 
-'''
+''']
     for v in index:
-        out += ('  ' * v['_level']) + f"* [{v['page_name']}](pages/{v['page_name']}.md)\n"
-    return out
+        out.append(('  ' * v['_level']) + f"* [{v['page_name']}](pages/{v['page_name']}.md)\n")
+    return ''.join(out)
+
+
+def wikifastimport(repo, commits):
+    """
+    Write the wiki commits to the git repo by streaming them into
+    git fast-import. The commits are added on top of the current branch and
+    the working tree is updated afterwards.
+    :param repo: GitPython repo to import into
+    :param commits: iterable of commit dicts from wikicommitgenerator()
+    """
+
+    ref = repo.head.ref.path
+    parent = repo.head.commit.hexsha if repo.head.is_valid() else None
+
+    def data(text):
+        b = text.encode()
+        return b'data %d\n%s\n' % (len(b), b)
+
+    proc = subprocess.Popen(['git', 'fast-import', '--quiet'], cwd=repo.git_dir,
+                            stdin=subprocess.PIPE)
+    out = proc.stdin
+    count = 0
+    for commit in commits:
+
+        name = f"{commit['name']}:{commit['version']}"
+        logging.debug(f"Converting page '{name}'")
+
+        ident = f"{commit['author_name']} <{commit['author_email']}> {int(commit['date'].timestamp())} +0000"
+        out.write(f"commit {ref}\nauthor {ident}\ncommitter {ident}\n".encode())
+        out.write(data(commit['message']))
+        if parent:
+            out.write(f"from {parent}\n".encode())
+            parent = None
+
+        for fname, contents in commit['files'].items():
+            if not contents:
+                logging.warning(f"Missing page data for {fname}")
+                continue
+            out.write(f"M 100644 inline {fname}\n".encode())
+            out.write(data(contents))
+        out.write(b'\n')
+        count += 1
+
+    out.close()
+    if proc.wait():
+        raise Exception(f"git fast-import failed with exit code {proc.returncode}")
+
+    # Update the index and working tree to the imported commits
+    repo.head.reset(index=True, working_tree=True)
+    logging.info(f"Imported {count} wiki commits")
+
+
+def wikiconvertedversions(repo):
+    """
+    Return the set of wiki page version ids which have been committed to the
+    repo, as recorded by the version trailer in the commit messages
+    """
+    if not repo.head.is_valid():
+        return set()
+    trailer = re.compile(f'^{WIKI_VERSION_TRAILER}: (.*)$', re.M)
+    return set(m for c in repo.iter_commits() for m in trailer.findall(c.message))
 
 
 def scrapeusers(data):
     """
-    Find all users reference in all tables
+    Find all users reference in all tables. The table fields are used to only
+    visit the tables and columns which refer to users. The number of references
+    to each user is counted in 'references'.
     """
 
     # Copy the predefined user database
     users = {k: v.copy() for k, v in ASSEMBLA_USERID.items()}
+    for u in users.values():
+        u.setdefault('tables', set())
+        u.setdefault('references', 0)
 
-    for table, entries in data.items():
-        if table.startswith('_'):
+    for table, fields in data['_fields'].items():
+        entries = data.get(table)
+        if not entries or table.startswith('_'):
             continue
+
+        # Skip tables without any user columns
+        columns = [t for t in USER_COLUMNS if t in fields]
+        if not columns:
+            continue
+
         for v in entries:
-            for t in ('user_id', 'created_by', 'updated_by', 'reporter_id', 'assigned_to_id'):
-                if t in v:
-                    uid = v[t]
-                    if not uid:
-                        continue
-                    u = users.setdefault(uid, {})
-                    u.setdefault('id', uid)
-                    u.setdefault('tables', set())
-                    u['tables'].add(table)
+            for t in columns:
+                uid = v[t]
+                if not uid:
+                    continue
+                u = users.get(uid)
+                if u is None:
+                    u = users[uid] = {'id': uid, 'tables': set(), 'references': 0}
+                u['tables'].add(table)
+                u['references'] += 1
 
     return users
 
 
-def mergeuserdata(userdata, users):
+def mergeuserdata(userdata, users, partial=False):
     """
     Merge incoming user data with the main data dict
     :param userdata: imported user data from file fetched with userdump
     :param users: dict of all users which the imported data will update
+    :param partial: users are scraped from a subset of the tables, so users
+                    not found there are added from userdata
     """
 
     count = 0
@@ -635,8 +1280,10 @@ def mergeuserdata(userdata, users):
         count += 1
         w = users.get(v['id'])
         if not w:
-            logging.warning(f"Skipping user '{v['id']}'. Not mentioned in main dump file")
-            continue
+            if not partial:
+                logging.warning(f"Skipping user '{v['id']}'. Not mentioned in main dump file")
+                continue
+            w = users[v['id']] = {'id': v['id'], 'tables': set(), 'references': 0}
 
         # The redacted emails in file will interfere with preset emails. Its better to remove
         # it altogether
@@ -657,46 +1304,60 @@ def mergeuserdata(userdata, users):
 #   # List
 RE_LIST = re.compile(r'^# (.*)$', re.M)
 
+def sub_list(m):
+    return '1. ' + m[1]
+
 # To find '** line'
 RE_LIST2 = re.compile(r'^\*\*([^\*]*)$', re.M)
 
+def sub_list2(m):
+    return '   * ' + m[1]
+
 # To find '** line'
 RE_LIST3 = re.compile(r'^([ \t]*)\*\*([^\*]*)$', re.M)
 
+def sub_list3(m):
+    return m[1] + '* ' + m[2]
+
 # To find old headers. Variants:
 #   .h1 Title  .h2 Title
 RE_HEADING = re.compile(r'^h(\d). ', re.M)
 
+def sub_heading(m):
+    return '#' * int(m[1]) + ' '
+
 # To find !text!. Variants:
 #    !<link!
 # 1=pre indent, 2=text
 RE_IMAGE = re.compile(r'(^[ \t]+)?!<?(\S+)!', re.M)
 
+def sub_image(m):
+    return f'![{m[2].split("/")[-1]}]({m[2]})'
+
 # To find @text@
 RE_QUOTE = re.compile(r'@([^@\n]+?)@', re.M)
 
+def sub_quote(m):
+    return f'`{m[1]}`'
+
 # To find <pre><code> blocks
 RE_PRECODE = re.compile(r'<pre><code>(.*?)</code></pre>', re.M | re.S)
 
 # To find <pre>...</pre> or {{{ ... }}} blocks
 RE_PRE = re.compile(r'(<pre>.*?</pre>|{{{.*?}}})', re.M | re.S)
 
-# To find table headers (|_. col1 |_. col2 |_. ... |)
-# 1=pre indent, 2=headers excluding opening '|_.' and closing '|'
-RE_TABLEHEADER = re.compile(r'^([ \t]+)?\|_\.(.*?)\|[ \t]*$', re.M)
-
-# To find table headers (||= col1 =||= col2 =||)
-# 1=pre indent, 2=headers excluding opening '|_.' and closing '|'
-RE_TABLEHEADER2 = re.compile(r'^([ \t]+)?\|\|=(.*?)=\|\|[ \t]*$', re.M)
+# To find table headers. Variants:
+#   |_. col1 |_. col2 |_. ... |    ||= col1 =||= col2 =||
+# 1=pre indent, 2=headers excluding opening '|_.' and closing '|',
+# 3=headers excluding opening '||=' and closing '=||'
+RE_TABLEHEADER = re.compile(r'^([ \t]+)?(?:\|_\.(.*?)\||\|\|=(.*?)=\|\|)[ \t]*$', re.M)
 
 def sub_tableheader(m):
     """ Substitute table header format """
-    columns = m[2].split('|_.')
-    return f'| {" | ".join([c.strip() for c in columns])} |\n|{" --- |" * len(columns)}'
-
-def sub_tableheader2(m):
-    """ Substitute table header format """
-    columns = m[2].split('=||=')
+    if m[2] is not None:
+        columns = m[2].split('|_.')
+    else:
+        columns = m[3].split('=||=')
     return f'| {" | ".join([c.strip() for c in columns])} |\n|{" --- |" * len(columns)}'
 
 # Find whole table (indicated by lines of |something|)
@@ -778,24 +1439,224 @@ def sub_link2(m):
 # To find [[links]] on separate lines
 RE_LINK3 = re.compile(r'^\[\[.*\]\]$', re.M)
 
+def sub_link3(m):
+    return '\n' + m[0]
+
 # To find URLs
 RE_URL = re.compile(r'\bhttps?://([\w\.\-]+)(/[\w\.\-/%#]*)?(\?[\w=%&\.\-$]*)?')
 
-def sub_url(m, is_wiki):
-    """ Replace URLs listed in URL_RE_REPLACE list """
-    t = m[0]
-    for r, n in (_URL_RE_WIKI if is_wiki else _URL_RE_TICKETS) + _URL_RE:
-        t = r.sub(n, t)
-    return t
+# To find the host names in the URL_RE_REPLACE patterns. Variants:
+#   ^https?://git\.assembla\.com/   ^https?://(www|app)\.assembla\.com/
+RE_URLRULEHOST = re.compile(r'^\^https\?://((?:\\\.|[\w\-]|\(\w+(?:\|\w+)*\))+)/')
 
+def urlrulehosts(pattern):
+    """
+    Return the set of hosts the URL rule pattern can match, or None if the
+    pattern can't be resolved to a set of host names
+    """
+    m = RE_URLRULEHOST.match(pattern)
+    if not m:
+        return None
+    # Every other part is a group of alternatives
+    parts = re.split(r'\(([\w|]+)\)', m[1])
+    choices = [p.split('|') if i % 2 else [p.replace('\\.', '.')] for i, p in enumerate(parts)]
+    return set(''.join(c) for c in itertools.product(*choices))
 
-# TODO:
-#  - Ticket #202.1
-#    Table def: ||= host api =||= status=||
-#    Interpretation: | --- | --- | --- | --- | --- |
-def migratetexttomd(text, ref, migrate_at=False, is_wiki=True, wikipages=None, documents=None):
+
+class UrlRewriter:
+    """
+    Rewrites the URLs listed in the URL_RE_REPLACE lists. The rules are
+    compiled once and dispatched on the host of the URL, so URLs to hosts
+    without any rules are passed through without running any regex. The
+    object is not changed after creation and can be shared between threads
+    and processes.
+    :param space: Assembla space name
+    :param github_url: GitHub repo URL
+    """
+
+    def __init__(self, space, github_url):
+        def compile(rules):
+            return [(re.compile(k.replace('{ASSEMBLA_SPACE}', space)), v.replace('{GITHUB_URL}', github_url))
+                    for k, v in rules]
+
+        common = compile(URL_RE_REPLACE)
+        self.dispatch = {
+            True: self.dispatchtable(compile(URL_RE_REPLACE_WIKI) + common),
+            False: self.dispatchtable(compile(URL_RE_REPLACE_TICKETS) + common),
+        }
+
+        # Identifies the rules for caching
+        self.key = repr((space, github_url))
+
+    @staticmethod
+    def dispatchtable(rules):
+        """
+        Return a dict of the rules to run for each host, in the order of the
+        list, and the rules to run for any other host
+        """
+        ruleshosts = [(rule, urlrulehosts(rule[0].pattern)) for rule in rules]
+        hosts = set().union(*(h for _, h in ruleshosts if h))
+        table = {
+            host: tuple(rule for rule, h in ruleshosts if h is None or host in h)
+            for host in hosts
+        }
+        return table, tuple(rule for rule, h in ruleshosts if h is None)
+
+    def sub(self, m, is_wiki):
+        """ Replace URL match m from RE_URL """
+        table, default = self.dispatch[is_wiki]
+        t = m[0]
+        for r, n in table.get(m[1], default):
+            t = r.sub(n, t)
+        return t
+
+
+def rulesub(name, regex, repl, text):
+    """
+    Run the substitution of a conversion rule. With repl None the text is split
+    on the regex instead.
+    """
+    if repl is None:
+        return regex.split(text)
+    return regex.sub(repl, text)
+
+
+class RuleStats:
+    """
+    Collects the number of calls, the number of substitutions and the time
+    spent for each markdown conversion rule and substitution callback
+    """
+
+    def __init__(self):
+        self.rules = {}
+
+    def add(self, name, count, elapsed):
+        """ Add a call to the statistics of a rule """
+        v = self.rules.setdefault(name, [0, 0, 0.0])
+        v[0] += 1
+        v[1] += count
+        v[2] += elapsed
+
+    def sub(self, name, regex, repl, text):
+        """ rulesub() recording the statistics """
+        start = time.perf_counter()
+        if repl is None:
+            result = regex.split(text)
+            count = len(result) // (regex.groups + 1)
+        else:
+            result, count = regex.subn(repl, text)
+        self.add(name, count, time.perf_counter() - start)
+        return result
+
+    def wrap(self, name, fn):
+        """ Return fn wrapped to record statistics of its calls """
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            self.add(name, 1, time.perf_counter() - start)
+            return result
+        return wrapper
+
+    def merge(self, other):
+        """ Add the statistics from another RuleStats """
+        for name, (calls, count, elapsed) in other.rules.items():
+            v = self.rules.setdefault(name, [0, 0, 0.0])
+            v[0] += calls
+            v[1] += count
+            v[2] += elapsed
+
+    def report(self):
+        """ Print the statistics, slowest rule first """
+        rows = sorted(self.rules.items(), key=lambda v: v[1][2], reverse=True)
+        print(tabulate(
+            [(name, calls, count, elapsed, elapsed / calls * 1e6) for name, (calls, count, elapsed) in rows],
+            headers=('Rule', 'Calls', 'Substitutions', 'Time (s)', 'Per call (us)'),
+            floatfmt=('', '', '', '.3f', '.1f'),
+        ))
+
+
+class TimeBudget:
+    """
+    Context manager raising MarkdownTimeout when its block runs for longer than
+    'seconds'. The regex engine checks for signals, so in the main thread a
+    SIGALRM timer interrupts even a single backtracking regex. Elsewhere the
+    budget is only enforced by calling check(). No budget if seconds is None.
+    The SIGALRM handler is installed on first use and left in place.
+    """
+
+    # Set when the SIGALRM handler is installed
+    installed = False
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.deadline = None
+        self.timer = False
+
+    def __enter__(self):
+        if self.seconds:
+            self.deadline = time.monotonic() + self.seconds
+            if hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread():
+                if not TimeBudget.installed:
+                    signal.signal(signal.SIGALRM, TimeBudget.alarm)
+                    TimeBudget.installed = True
+                signal.setitimer(signal.ITIMER_REAL, self.seconds)
+                self.timer = True
+        return self
+
+    def __exit__(self, *exc):
+        if self.timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            self.timer = False
+
+    @staticmethod
+    def alarm(signum, frame):
+        raise MarkdownTimeout()
+
+    def check(self):
+        """ Raise MarkdownTimeout if the time budget is used up """
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise MarkdownTimeout()
+
+    def guard(self, fn):
+        """ Return fn wrapped to check() the time budget before each call """
+        def wrapper(*args, **kwargs):
+            self.check()
+            return fn(*args, **kwargs)
+        return wrapper
+
+
+# Openers of the patterns that backtrack over the rest of the line or text
+# when they are not closed
+UNCLOSED_MARKUP = (('[[', ']]'), ('](', ')'), ('<pre>', '</pre>'), ('{{{', '}}}'))
+
+def unclosedmarkup(text):
+    """ Return the opener left unclosed more than MARKDOWN_MAX_UNCLOSED times in text, or None """
+    for opener, closer in UNCLOSED_MARKUP:
+        if opener in text and text.count(opener) - text.count(closer) > MARKDOWN_MAX_UNCLOSED:
+            return opener
+    return None
+
+
+def migratetexttomd(text, ref, migrate_at=False, is_wiki=True, wikipages=None, documents=None,
+                    urlrewriter=None, stats=None, budget=MARKDOWN_TIME_BUDGET):
+    """
+    Convert Assembla text to GitHub markdown. Texts with too much unclosed
+    markup, or whose conversion takes more than 'budget' seconds, are converted
+    with simpletexttomd() instead and reported with a warning.
+    """
+    return texttomd(text, ref, migrate_at=migrate_at, is_wiki=is_wiki, wikipages=wikipages, documents=documents,
+                    urlrewriter=urlrewriter, stats=stats, budget=budget)[0]
+
+
+def texttomd(text, ref, migrate_at=False, is_wiki=True, wikipages=None, documents=None,
+             urlrewriter=None, stats=None, budget=MARKDOWN_TIME_BUDGET):
+    """
+    migratetexttomd() returning tuple (text, timedout). timedout is True when
+    the conversion exceeded the time budget, so the result depends on the
+    machine load and must not be cached.
+    """
     if not text:
-        return text
+        return (text, False)
 
     # Convert to unix line endings
     otext = text
@@ -803,9 +1664,71 @@ def migratetexttomd(text, ref, migrate_at=False, is_wiki=True, wikipages=None, d
     if otext[-1] == '\n' or text[-1] != '\n':
         text += '\n'
 
+    timedout = False
+    opener = unclosedmarkup(text)
+    if opener:
+        logging.warning(f"{ref}: Too many unclosed '{opener}', using simple markdown conversion")
+    else:
+        try:
+            with TimeBudget(budget) as timer:
+                return (fulltexttomd(text, ref, migrate_at, is_wiki, wikipages, documents, urlrewriter, stats, timer),
+                        False)
+        except MarkdownTimeout:
+            logging.warning(f"{ref}: Markdown conversion exceeded {budget} s, using simple markdown conversion")
+            timedout = True
+
+    start = time.perf_counter()
+    text = simpletexttomd(text, is_wiki, urlrewriter)
+    if stats:
+        stats.add('simpletexttomd', 1, time.perf_counter() - start)
+    return (text, timedout)
+
+
+def simpletexttomd(text, is_wiki=True, urlrewriter=None):
+    """
+    Linear time markdown conversion of a text with unix line endings. Only the
+    rules anchored to the line start and the URL rewrite are used, as they
+    cannot backtrack.
+    """
+    if '# ' in text:
+        text = RE_LIST.sub(sub_list, text)
+    if '**' in text:
+        text = RE_LIST2.sub(sub_list2, text)
+        text = RE_LIST3.sub(sub_list3, text)
+    if 'h' in text:
+        text = RE_HEADING.sub(sub_heading, text)
+    text = text.replace('<hr>', '---')
+    if urlrewriter and '://' in text:
+        text = RE_URL.sub(functools.partial(urlrewriter.sub, is_wiki=is_wiki), text)
+    return text
+
+
+# TODO:
+#  - Ticket #202.1
+#    Table def: ||= host api =||= status=||
+#    Interpretation: | --- | --- | --- | --- | --- |
+def fulltexttomd(text, ref, migrate_at, is_wiki, wikipages, documents, urlrewriter, stats, timer):
+    """
+    Full markdown conversion of a text with unix line endings. The rules are
+    not run after the TimeBudget 'timer' is used up.
+    """
+
+    # Run the substitutions through the RuleStats if collecting statistics
+    sub = stats.sub if stats else rulesub
+
+    # Without the budget timer, check the budget before each rule
+    if not timer.timer:
+        sub = timer.guard(sub)
+
+    # The substitutions are only run when the text contains the characters
+    # their patterns require
+
     # Split on all <pre> groups
     textlist = []
-    for text in RE_PRE.split(text):
+    segments = [text]
+    if '<pre>' in text or '{{{' in text:
+        segments = sub('RE_PRE', RE_PRE, None, text)
+    for text in segments:
 
         # The text is a <pre>...</pre> group
         if text.startswith('<pre>') or text.startswith('{{{'):
@@ -831,35 +1754,43 @@ def migratetexttomd(text, ref, migrate_at=False, is_wiki=True, wikipages=None, d
         # Not a <pre>..</pre> group, i.e. ordinary wiki:
 
         # Replace # lines with numbered lists
-        text = RE_LIST.sub(lambda m: '1. ' + m[1], text)
+        if '# ' in text:
+            text = sub('RE_LIST', RE_LIST, sub_list, text)
 
-        # Replace '** line' with '  * line'
-        text = RE_LIST2.sub(lambda m: '   * ' + m[1], text)
+        if '**' in text:
+            # Replace '** line' with '  * line'
+            text = sub('RE_LIST2', RE_LIST2, sub_list2, text)
 
-        # Replace '   ** line' with '   * line'
-        text = RE_LIST3.sub(lambda m: m[1] + '* ' + m[2], text)
+            # Replace '   ** line' with '   * line'
+            text = sub('RE_LIST3', RE_LIST3, sub_list3, text)
 
         # Replacing .h1 .h2 headers
-        text = RE_HEADING.sub(lambda m: '#' * int(m[1]) + ' ', text)
+        if 'h' in text:
+            text = sub('RE_HEADING', RE_HEADING, sub_heading, text)
 
         # Replacing !image!
-        text = RE_IMAGE.sub(lambda m: f'![{m[2].split("/")[-1]}]({m[2]})', text)
+        if '!' in text:
+            text = sub('RE_IMAGE', RE_IMAGE, sub_image, text)
 
         # Replacing @quote@
-        if migrate_at:
-            text = RE_QUOTE.sub(lambda m: f'`{m[1]}`', text)
+        if migrate_at and '@' in text:
+            text = sub('RE_QUOTE', RE_QUOTE, sub_quote, text)
 
         # Replacing <hr>
         text = text.replace('<hr>', '---')
 
         # Replacing [[links]]
-        text = RE_LINK.sub(functools.partial(sub_link, ref=ref, is_wiki=is_wiki, wikipages=wikipages, documents=documents), text)
+        if '[[' in text:
+            fn = functools.partial(sub_link, ref=ref, is_wiki=is_wiki, wikipages=wikipages, documents=documents)
+            text = sub('RE_LINK', RE_LINK, stats.wrap('sub_link', fn) if stats else fn, text)
 
         # Replacing [name](link)
-        text = RE_LINK2.sub(sub_link2, text)
+        if '](' in text:
+            text = sub('RE_LINK2', RE_LINK2, sub_link2, text)
 
         # Insert a newline on lines with [[links]] to ensure its not inline text
-        text = RE_LINK3.sub(lambda m: '\n' + m[0], text)
+        if '[[' in text:
+            text = sub('RE_LINK3', RE_LINK3, sub_link3, text)
 
         # Commit segment
         textlist.append(text)
@@ -867,23 +1798,26 @@ def migratetexttomd(text, ref, migrate_at=False, is_wiki=True, wikipages=None, d
     # Combine into continous text again
     text = ''.join(textlist)
 
-    # Replace table headers for |_. headers |_.
-    text = RE_TABLEHEADER.sub(sub_tableheader, text)
+    if '|' in text:
+        # Replace table headers for |_. headers |_. and ||= headers =||
+        if '|_.' in text or '||=' in text:
+            text = sub('RE_TABLEHEADER', RE_TABLEHEADER, sub_tableheader, text)
 
-    # Replace table headers for ||= headers =||
-    text = RE_TABLEHEADER2.sub(sub_tableheader2, text)
+        # Ensure tables have table headers
+        text = sub('RE_TABLE', RE_TABLE, sub_tableaddheader, text)
 
-    # Ensure tables have table headers
-    text = RE_TABLE.sub(sub_tableaddheader, text)
+    if '://' in text:
+        # Replace URLs in text
+        if urlrewriter:
+            fn = functools.partial(urlrewriter.sub, is_wiki=is_wiki)
+            text = sub('RE_URL', RE_URL, stats.wrap('UrlRewriter.sub', fn) if stats else fn, text)
 
-    # Replace URLs in text
-    text = RE_URL.sub(functools.partial(sub_url, is_wiki=is_wiki), text)
-
-    # Inform about remaining assembla links
-    for m in RE_URL.finditer(text):
-        if 'assembla' not in m[1]:
-            continue
-        logging.warning(f"{ref}: Link to {colorama.Fore.GREEN}Assembla{colorama.Style.RESET_ALL}: '{m[0]}'")
+        # Inform about remaining assembla links
+        if 'assembla' in text:
+            for m in RE_URL.finditer(text):
+                if 'assembla' not in m[1]:
+                    continue
+                logging.warning(f"{ref}: Link to {colorama.Fore.GREEN}Assembla{colorama.Style.RESET_ALL}: '{m[0]}'")
 
     return text
 
@@ -901,7 +1835,8 @@ def dumpdict(filename, files, prefix):
 
 def ticketparser(data):
     """
-    Parse the tickets
+    Parse the tickets. The references between the ticket tables are resolved
+    on access, as declared in RELATIONS.
     """
 
     # milestones
@@ -931,14 +1866,10 @@ def ticketparser(data):
     # ticket_tags
     # ===========
     #   created_at, id, tag_name_id, ticket_id, updated_at, user_id
-    for v in data['ticket_tags']:
-        v['_tag_name'] = data.find('tag_names', v['tag_name_id'])
 
     # workflow_property_vals
     # ======================
     #   id, space_tool_id, value, workflow_instance_id, workflow_property_def_id
-    for v in data['workflow_property_vals']:
-        v['_type'] = data.find('workflow_property_defs', v['workflow_property_def_id'])['title']
 
     # workflow_property_defs
     # ======================
@@ -956,16 +1887,6 @@ def ticketparser(data):
     # ticket_comments
     # ===============
     #    comment, created_on, id, rendered, ticket_changes, ticket_id, updated_at, user_id
-    for v in data['ticket_comments']:
-        v['_created_on'] = datetime.fromisoformat(v['created_on'])
-        v['_updated_at'] = datetime.fromisoformat(v['updated_at'])
-
-        changes = list(filter(lambda x: x['ticket_comment_id'] == v['id'], data['ticket_changes']))
-        v['_changes'] = changes
-        for c in changes:
-            c['_comment'] = v
-
-        v['_user'] = data.find('_users', v['user_id'])
 
     # DEBUG
     # printtable(data['ticket_comments'], exclude=('comment', ), include=('_changes',))
@@ -977,80 +1898,11 @@ def ticketparser(data):
     #   permission_type, priority, reporter_id, space_id, state, status_updated_at, story_importance,
     #   summary, ticket_status_id, total_estimate, total_invested_hours, total_working_hours,
     #   updated_at, working_hours
-    for v in data['tickets']:
-        ticket = v['id']
-
-        v['_created_on'] = datetime.fromisoformat(v['created_on'])
-        if not v['state']:
-            v['_completed_date'] = datetime.fromisoformat(v['completed_date'])
-        v['_updated_at'] = datetime.fromisoformat(v['updated_at'])
-        v['_milestone'] = data.find('milestones', v['milestone_id'], default=None)
-        v['_milestone_text'] = dig(v, '_milestone', 'title')
-        v['_ticket_status'] = data.find('ticket_statuses', v['ticket_status_id'])
-        v['_reporter'] = data.find('_users', v['reporter_id'])
-        v['_assigned_to'] = data.find('_users', v['assigned_to_id'], default=None)
-        v['_state'] = githubstate(v['state'])
-        v['_priority'] = ASSEMBLA_PRIORITY_MAPPING[v['priority']]
-        v['_status'] = v['_ticket_status']['name']
-        v['_tags'] = set([
-            x['_tag_name']['name'] for x in data['ticket_tags']
-            if x['ticket_id'] == ticket
-        ]) or None
-
-        comments = list(filter(lambda x: x['ticket_id'] == ticket, data['ticket_comments']))
-        v['_comments'] = comments
-        for c in comments:
-            c['_ticket'] = v
-
-        # Set component and keywords
-        for wf in filter(lambda x: x['workflow_instance_id'] == ticket, data['workflow_property_vals']):
-            t = wf['_type'].lower()
-            if t == 'keywords':
-                # Split keywords into distinct words
-                s = v.setdefault('_' + t, set())
-                s.update(wf['value'].split(' '))
-            elif t == 'component':
-                s = v.setdefault('_' + t, set())
-                s.add(wf['value'])
-            else:
-                logging.warning(f"Unknown workflow name '{t}' on ticket {v['id']}")
 
     # ticket_changes
     # ===============
     #   after, before, created_at, extras, id, subject, ticket_comment_id, updated_at
 
-    def _notify(name, field, v):
-        logging.warning(f"Uknown {name} '{v[field]}' on ticket change {v['id']} in ticket #{v['_comment']['_ticket']['number']}")
-
-    for v in data['ticket_changes']:
-        v['_created_at'] = datetime.fromisoformat(v['created_at'])
-        v['_updated_at'] = datetime.fromisoformat(v['updated_at'])
-
-        subject = v['subject']
-        if subject == 'status':
-            v['_before'] = findfirst(lambda x: x['name'] == v['before'], data['ticket_statuses'], None)
-            v['_after'] = findfirst(lambda x: x['name'] == v['after'], data['ticket_statuses'])
-            if v['before'] and not v['_before']:
-                _notify('ticket status', 'before', v)
-            if v['after'] and not v['_after']:
-                _notify('ticket status', 'after', v)
-
-        elif subject == 'milestone_id':
-            v['_before'] = findfirst(lambda x: x['title'] == v['before'], data['milestones'])
-            v['_after'] = findfirst(lambda x: x['title'] == v['after'], data['milestones'])
-            if v['before'] and not v['_before']:
-                _notify('milestone', 'before', v)
-            if v['after'] and not v['_after']:
-                _notify('milestone', 'after', v)
-
-        elif subject == 'assigned_to_id':
-            v['_before'] = findfirst(lambda x: x.get('login', Unset) == v['before'], data['_users'])
-            v['_after'] = findfirst(lambda x: x.get('login', Unset) == v['after'], data['_users'])
-            if v['before'] and not v['_before']:
-                _notify('user', 'before', v)
-            if v['after'] and not v['_after']:
-                _notify('user', 'after', v)
-
     # Ensure all issues are present in order. Otherwise the migration to GitHub will be out of sync with Assembla
     tickets = set(k['number'] for k in data['tickets'])
     for i in range(1, len(data['tickets']) + 1):
@@ -1274,10 +2126,15 @@ def tickettimelinegenerator(ticket):
     return changes
 
 
-def tickettogithub(ticket, changes, wikipages=None, documents=None):
+def tickettogithub(ticket, changes, wikipages=None, documents=None, cache=None, urlrewriter=None,
+                   stats=None):
     """
     Convert ticket with changes list to github format
+    :param cache: optional MarkdownCache to use for the text conversions
+    :param urlrewriter: optional UrlRewriter for the URLs in the texts
+    :param stats: optional RuleStats to collect conversion rule statistics in
     """
+    convert = cache.migratetexttomd if cache else migratetexttomd
     github = {}
     key = ticket['number']
 
@@ -1294,7 +2151,8 @@ def tickettogithub(ticket, changes, wikipages=None, documents=None):
     github = {
         # Description
         "title": ticket['summary'],
-        "body": migratetexttomd(ticket['description'], f'Ticket #{key}', is_wiki=False, wikipages=wikipages, documents=documents),
+        "body": convert(ticket['description'], f'Ticket #{key}', is_wiki=False, wikipages=wikipages, documents=documents,
+                        urlrewriter=urlrewriter, stats=stats),
         "annotation": githubcreatedheader(ticket['_reporter']),
 
         # Dates
@@ -1328,7 +2186,8 @@ def tickettogithub(ticket, changes, wikipages=None, documents=None):
         # The change is a comment
         if change.get('body'):
             ghchange.update({
-                "body": migratetexttomd(change.get('body'), f'Ticket #{ckey}', is_wiki=False, wikipages=wikipages, documents=documents),
+                "body": convert(change.get('body'), f'Ticket #{ckey}', is_wiki=False, wikipages=wikipages,
+                                documents=documents, urlrewriter=urlrewriter, stats=stats),
                 "annotation": githubcommentedheader(change['user']),
             })
 
@@ -1369,22 +2228,188 @@ def tickettogithub(ticket, changes, wikipages=None, documents=None):
     return (github, ghchanges)
 
 
-def check_config(config, parser, required):
+# State of the ticket conversion worker processes, set by ticketworkerinit()
+_TICKET_WORKER = {}
 
-    missing = [
-        k for k in required
-        if k not in config or not config[k] or (config[k].startswith('**') and config[k].endswith('**'))
-    ]
-    if missing:
-        parser.error(f"Missing config file fields: {' '.join(missing)}")
 
+def ticketworkerinit(data, wikipages, cache, urlrewriter, stats, level):
+    """ Initialize a ticket conversion worker process for ticketworker() """
+    data.bindrelations()
+    # The messages are collected and logged by the main process
+    root = logging.getLogger()
+    root.handlers = []
+    root.setLevel(level)
+    if cache:
+        # Start tracking the entries added by this process
+        cache.takeadded()
+    _TICKET_WORKER.update(data=data, wikipages=wikipages, cache=cache, urlrewriter=urlrewriter, stats=stats,
+                          tickets={ticket['number']: ticket for ticket in data['tickets']})
 
-def check_authconfig(auth, parser, required):
 
-    # Ensure we have auth data and the fields needed
-    if not auth:
-        parser.error("Authentication config --auth is required")
-    missing = [
+def ticketworker(numbers):
+    """
+    Convert tickets in a worker process
+    :param numbers: list of ticket numbers
+    :returns: tuple (results, messages, cacheadded, stats), where results is a
+              list of (changes, issue, ghchanges, workflow) and messages is a
+              list of the logged (level, message) for each ticket
+    """
+    worker = _TICKET_WORKER
+    data = worker['data']
+    cache = worker['cache']
+    stats = RuleStats() if worker['stats'] else None
+    results = []
+    messages = []
+    for number in numbers:
+        with LogCapture() as capture:
+            ticket = worker['tickets'][number]
+            changes = tickettimelinegenerator(ticket)
+            issue, ghchanges = tickettogithub(ticket, changes, wikipages=worker['wikipages'],
+                                              documents=data['_index']['documents'], cache=cache,
+                                              urlrewriter=worker['urlrewriter'], stats=stats)
+        results.append((changes, issue, ghchanges, ticket.get('_workflow')))
+        messages.append([(record.levelno, record.getMessage()) for record in capture.records])
+    return (results, messages, cache.takeadded() if cache else None, stats)
+
+
+def ticketconversiongenerator(tickets, data, wikipages, cache=None, urlrewriter=None, stats=None, jobs=1):
+    """
+    Convert the tickets to github format
+    :param tickets: list of tickets to convert
+    :param cache: optional MarkdownCache to use for the text conversions
+    :param urlrewriter: optional UrlRewriter for the URLs in the texts
+    :param stats: optional RuleStats to collect conversion rule statistics in
+    :param jobs: number of processes. With more than one, the tickets are
+                 converted in a pool of processes. The messages logged by the
+                 conversions are logged again in ticket order.
+    :returns: Generator which yields tuple (ticket, changes, issue, ghchanges) in
+              the order of tickets
+    """
+    documents = data['_index']['documents']
+    if jobs <= 1:
+        for ticket in tickets:
+            changes = tickettimelinegenerator(ticket)
+            issue, ghchanges = tickettogithub(ticket, changes, wikipages=wikipages, documents=documents,
+                                              cache=cache, urlrewriter=urlrewriter, stats=stats)
+            yield (ticket, changes, issue, ghchanges)
+        return
+
+    def chunkresults(chunk, future):
+        results, messages, cacheadded, rulestats = future.result()
+        if cache:
+            cache.merge(*cacheadded)
+        if stats:
+            stats.merge(rulestats)
+        for ticket, (changes, issue, ghchanges, workflow), ticketmessages in zip(chunk, results, messages):
+            for level, msg in ticketmessages:
+                logging.log(level, msg)
+            # Resolving the workflow again would repeat its warnings
+            if workflow is not None:
+                ticket['_workflow'] = workflow
+            yield (ticket, changes, issue, ghchanges)
+
+    initargs = (data, wikipages, cache, urlrewriter, stats is not None, logging.getLogger().level)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=ticketworkerinit,
+                                                initargs=initargs) as executor:
+        # Keep a limited number of chunks queued, as the caller may be slow
+        queue = collections.deque()
+        try:
+            for i in range(0, len(tickets), TICKET_JOB_CHUNK):
+                chunk = tickets[i:i + TICKET_JOB_CHUNK]
+                queue.append((chunk, executor.submit(ticketworker, [ticket['number'] for ticket in chunk])))
+                if len(queue) >= jobs * TICKET_JOB_BACKLOG:
+                    yield from chunkresults(*queue.popleft())
+            while queue:
+                yield from chunkresults(*queue.popleft())
+        finally:
+            for chunk, future in queue:
+                future.cancel()
+
+
+def githubimportdata(ghissue, ghchanges, github_milestones):
+    """
+    Return the GitHub issue import request data for a converted ticket
+    :param ghissue: issue from tickettogithub()
+    :param ghchanges: changes from tickettogithub()
+    :param github_milestones: list of the GitHub milestones
+    """
+
+    # Find the GH milestone
+    milestone = ghissue['milestone']
+    ghmilestone = findfirst(lambda v: v.title == milestone, github_milestones)
+    if ghmilestone:
+        ghmilestone = ghmilestone.number
+
+    #   "issue": {
+    #     "title": "Imported from some other system",
+    #     "body": "...",
+    #     "created_at": "2014-01-01T12:34:58Z",
+    #     "closed_at": "2014-01-02T12:24:56Z",
+    #     "updated_at": "2014-01-03T11:34:53Z",
+    #     "assignee": "jonmagic",
+    #     "milestone": 1,
+    #     "closed": true,
+    #     "labels": [
+    #       "bug",
+    #       "low"
+    #     ]
+    #   },
+    issue = {
+        'title': ghissue['title'],
+        'body': ghissue['annotation'] + '\n\n' + ghissue['body'],
+        'created_at': ghissue['created_at'],
+        'updated_at': ghissue['updated_at'],
+        'assignee': None,  # Don't want to migrate assignee
+        'milestone': ghmilestone,
+        'closed': ghissue['closed'],
+        'labels': list(ghissue['labels']),
+    }
+    if ghissue['closed']:
+        issue['closed_at'] = ghissue['closed_at']
+
+    #    "comments": [
+    #    {
+    #      "created_at": "2014-01-02T12:34:56Z",
+    #      "body": "talk talk"
+    #    }
+    #    ]
+    comments = []
+    for change in ghchanges:
+
+        if 'annotation' not in change:
+            continue
+
+        body = ''
+        if change.get('body'):
+            body = '\n\n' + change.get('body')
+
+        comments.append({
+            'created_at': change['date'],
+            'body': change['annotation'] + body,
+        })
+
+    return {
+        'issue': issue,
+        'comments': comments,
+    }
+
+
+def check_config(config, parser, required):
+
+    missing = [
+        k for k in required
+        if k not in config or not config[k] or (config[k].startswith('**') and config[k].endswith('**'))
+    ]
+    if missing:
+        parser.error(f"Missing config file fields: {' '.join(missing)}")
+
+
+def check_authconfig(auth, parser, required):
+
+    # Ensure we have auth data and the fields needed
+    if not auth:
+        parser.error("Authentication config --auth is required")
+    missing = [
         k for k in required
         if k not in auth or not auth[k] or (auth[k].startswith('**') and auth[k].endswith('**'))
     ]
@@ -1392,6 +2417,238 @@ def check_authconfig(auth, parser, required):
         parser.error(f"Missing auth file fields: {' '.join(missing)}")
 
 
+class TokenBucket:
+    """
+    Thread safe token bucket rate limiter, allowing on average 'rate' calls
+    per second with bursts of up to 'burst' calls. A rate of 0 is unlimited.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """ Take a token, waiting until one is available """
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            # A negative count reserves a future token for this caller
+            self.tokens -= 1
+            wait = -self.tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class AssemblaApi:
+    """
+    Client for the Assembla REST API. The keep-alive HTTP session and the
+    rate limit are shared between the worker threads of map(). If 'cache' is
+    set, responses with an ETag or Last-Modified are stored in that directory
+    and revalidated with conditional requests on the next scrape.
+    """
+
+    def __init__(self, config, auth, rate=ASSEMBLA_API_RATE, workers=ASSEMBLA_API_WORKERS,
+                 cache=None):
+        self.url = config.get('api_url', ASSEMBLA_API_URL).rstrip('/')
+        self.workers = workers
+        self.cache = cache
+        self.stats = collections.Counter()
+        self.statslock = threading.Lock()
+        if cache:
+            cache.mkdir(parents=True, exist_ok=True)
+        self.bucket = TokenBucket(rate)
+        self.session = requests.Session()
+        self.session.headers.update({
+            'X-Api-Key': auth['assembla_key'],
+            'X-Api-Secret': auth['assembla_secret'],
+        })
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, path, **params):
+        """
+        Rate limited GET request of the API path. Requests failing with 429,
+        5xx, connection errors or timeouts are retried with exponential
+        backoff. The last response is returned, or the connection error or
+        timeout raised, when the retries are exhausted.
+        """
+        url = requests.Request('GET', f"{self.url}/{path}", params=params).prepare().url
+        cached, headers = self.cacheload(url)
+
+        for attempt in range(ASSEMBLA_API_RETRIES + 1):
+            self.bucket.acquire()
+            delay = ASSEMBLA_API_BACKOFF * 2 ** attempt
+            try:
+                req = self.session.get(url, headers=headers, timeout=ASSEMBLA_API_TIMEOUT)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == ASSEMBLA_API_RETRIES:
+                    raise
+                error = e
+            else:
+                if (req.status_code != 429 and req.status_code < 500) or attempt == ASSEMBLA_API_RETRIES:
+                    return self.cachestore(url, req, cached)
+                error = f"Error code {req.status_code}"
+                retryafter = req.headers.get('Retry-After', '')
+                if retryafter.isdigit():
+                    delay = max(delay, int(retryafter))
+            logging.debug(f"   Retrying '{path}' in {delay}s: {error}")
+            time.sleep(delay)
+
+    def cacheload(self, url):
+        """
+        Return the cache entry of the URL, if any, and the headers for a
+        conditional request revalidating it
+        """
+        if not self.cache:
+            return None, None
+        filename = pathlib.Path(self.cache, hashlib.sha1(url.encode()).hexdigest() + '.json')
+        try:
+            with open(filename, encoding='utf8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None, None
+        headers = {}
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        return cached, headers
+
+    def cachestore(self, url, req, cached):
+        """
+        Update the cache with the response of the URL. A 304 Not Modified
+        response is replaced by the cached response.
+        """
+        if not self.cache:
+            return req
+        if req.status_code == 304 and cached:
+            self.count('hits')
+            req.status_code = 200
+            req._content = cached['body'].encode()
+            req.encoding = 'utf-8'
+            return req
+        self.count('misses')
+        etag = req.headers.get('ETag')
+        last_modified = req.headers.get('Last-Modified')
+        if req.status_code == 200 and (etag or last_modified):
+            filename = pathlib.Path(self.cache, hashlib.sha1(url.encode()).hexdigest() + '.json')
+            tmpname = filename.with_suffix(f'.{threading.get_ident()}.tmp')
+            with open(tmpname, 'w', encoding='utf8') as f:
+                json.dump({'url': url, 'etag': etag, 'last_modified': last_modified, 'body': req.text}, f)
+            tmpname.replace(filename)
+        return req
+
+    def count(self, key):
+        """ Count a cache statistic """
+        with self.statslock:
+            self.stats[key] += 1
+
+    def logstats(self):
+        """ Log the cache statistics """
+        if self.cache:
+            logging.info(f"HTTP cache: {self.stats['hits']} not modified, {self.stats['misses']} fetched")
+
+    def getall(self, path, per_page=ASSEMBLA_API_PER_PAGE, **params):
+        """
+        Fetch all entries of a paginated API listing by following the pages
+        until an empty page. A short page does not end the listing, as the API
+        may return fewer entries per page than requested. Returns None if any
+        page fails.
+        """
+        out = []
+        page = 1
+        while True:
+            req = self.get(path, per_page=per_page, page=page, **params)
+            if req.status_code == 204:
+                break
+            if req.status_code != 200:
+                logging.error(f"   Failed to fetch '{path}' page {page}: Error code {req.status_code}")
+                return None
+            entries = req.json()
+            if not entries:
+                break
+            out.extend(entries)
+            page += 1
+        return out
+
+    def map(self, fn, iterable):
+        """ Run fn on each item concurrently, producing the results in order """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            yield from executor.map(fn, iterable)
+
+
+def httpcachedir(config, options):
+    """ Return the directory of the scrape HTTP cache, or None if disabled """
+    if options.no_http_cache:
+        return None
+    return pathlib.Path(config.get('cachedir', CACHE_DIR), HTTP_CACHE_SUBDIR)
+
+
+class ScrapeWriter:
+    """
+    Output file of a scrape. Entries in a JSON lines file (.jsonl) are appended
+    as they arrive, and the entries already in the file from an interrupted
+    run are loaded into 'entries'. Other files are written as one JSON list
+    when closed.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.entries = []
+        self.file = None
+        if str(filename).endswith('.jsonl'):
+            path = pathlib.Path(filename)
+            if path.exists():
+                with open(path, 'rb+') as f:
+                    text = f.read()
+                    end = text.rfind(b'\n') + 1
+                    if end < len(text):
+                        logging.warning(f"Removing incomplete last entry in '{filename}'")
+                        f.truncate(end)
+                self.entries = [json.loads(line) for line in text[:end].splitlines() if line.strip()]
+            self.file = open(path, 'a', encoding='utf8')
+
+    def append(self, entry):
+        """ Add an entry to the output """
+        self.entries.append(entry)
+        if self.file:
+            self.file.write(json.dumps(entry) + '\n')
+            self.file.flush()
+
+    def close(self):
+        """ Complete the output file """
+        if self.file:
+            self.file.close()
+            return
+        with open(self.filename, 'w') as f:
+            json.dump(self.entries, f)
+
+
+def readscrapefile(filename):
+    """
+    Generator producing the entries of a scrape file. A JSON lines file
+    (.jsonl) is streamed one line at a time, other files are read as one
+    JSON list.
+    """
+    with open(filename, encoding='utf8') as filereader:
+        if not str(filename).endswith('.jsonl'):
+            yield from json.load(filereader)
+            return
+        for line in filereader:
+            if not line.endswith('\n'):
+                logging.warning(f"Skipping incomplete last entry in '{filename}'")
+                break
+            if line.strip():
+                yield json.loads(line)
+
+
 class ColorFormatter(logging.Formatter):
     """ Logger for formatting colored console output """
     def format(self, record):
@@ -1403,6 +2660,338 @@ class ColorFormatter(logging.Formatter):
         return super().format(record)
 
 
+def readassembladata(config, options, tables=None):
+    """
+    Read the Assembla dump file and the optional user and wiki dump files
+    :param config: configuration dict
+    :param options: parsed command line options
+    :param tables: set of tables to read from the dump file. Read all if None.
+    :returns: DictPlus with the indexed Assembla dataset
+    """
+
+    # -------------------------------------------------------------------------
+    #  Read the dump file
+
+    logging.info(f"Parsing dumpfile '{config['dumpfile']}'")
+    with open(config['dumpfile'], encoding='utf8') as filereader:
+        data = DictPlus()
+        tablefields = {}
+
+        generator = filereadertoassemblaobjectgenerator(filereader, tablefields, tables)
+        if options.parse_jobs > 1:
+            logging.info(f"    Using {options.parse_jobs} parse processes")
+            generator = paralleldumpgenerator(config['dumpfile'], tablefields, options.parse_jobs, tables)
+
+        # for each line determine the assembla object type, read all attributes to dict using the mappings
+        # assign a key for each object which is used to link github <-> assembla objects to support updates
+        count = 0
+        for linenum, line, table, row in generator:
+
+            # Collect the file data
+            data.setdefault(table, [])
+            data.get(table).append(row)
+            count += 1
+
+        logging.info(f"    Parsed {count} rows")
+
+    # -------------------------------------------------------------------------
+    #  Index the data
+
+    logging.info("Indexing the data")
+
+    # Store the fields for the tables
+    data['_fields'] = tablefields
+
+    # Convert table list to dicts indexed by key using keymap
+    data['_index'] = indexassembladata(data, {
+
+        # None key specified index key for all unlisted tables.
+        # None: 'id',
+
+        # Tables to index
+        'wiki_pages': 'id',
+        'milestones': 'id',
+        'ticket_statuses': 'id',
+        'workflow_property_defs': 'id',
+        'wiki_page_versions': 'id',
+        'tag_names': 'id',
+        'documents': 'id',
+        'tickets': 'id',
+        'ticket_comments': 'id',
+    })
+
+    # Group tables by their foreign keys
+    data['_groups'] = groupassembladata(data, {
+        'ticket_changes': ('ticket_comment_id', ),
+        'ticket_comments': ('ticket_id', ),
+        'ticket_tags': ('ticket_id', ),
+        'workflow_property_vals': ('workflow_instance_id', ),
+    })
+
+    # -------------------------------------------------------------------------
+    #  Read the wiki dump data
+
+    if 'wikidump' in config and 'wiki_page_versions' in data['_index']:
+
+        logging.info(f"Parsing wiki dumpfile '{config['wikidump']}'")
+
+        # Merge the file data with the main assembla database
+        mergewikidata(readscrapefile(config['wikidump']), data['_index']['wiki_page_versions'])
+
+    # -------------------------------------------------------------------------
+    #  UserID scrape
+
+    logging.info("Scraping for user IDs")
+
+    users = scrapeusers(data)
+    data["_index"]["_users"] = users
+
+    # -------------------------------------------------------------------------
+    #  Read the user dump data
+
+    if 'userdump' in config:
+
+        logging.info(f"Parsing user dumpfile '{config['userdump']}'")
+
+        # Merge the file data with the main assembla database
+        mergeuserdata(readscrapefile(config['userdump']), data['_index']['_users'],
+                      partial=tables is not None)
+
+    data["_users"] = list(users.values())
+
+    return data
+
+
+def datasetcachekey(config, tables=None):
+    """
+    Return the key for the dataset cache. It changes whenever any of the input
+    files or this script (which contains the user mappings) are modified.
+    """
+    key = hashlib.sha1(f"v{TOOLVERSION}:{sorted(tables or [])}".encode())
+    for name in (config['dumpfile'], config.get('userdump'), config.get('wikidump'), __file__):
+        if not name:
+            continue
+        path = pathlib.Path(name)
+        st = path.stat()
+        key.update(f"{path.resolve()}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return key.hexdigest()
+
+
+def loaddatasetcache(filename, key):
+    """
+    Load the dataset from the cache file. The warnings logged when the dataset
+    was read are logged again.
+    :param filename: cache file
+    :param key: expected cache key from datasetcachekey()
+    :returns: The cached dataset or None if the cache is missing or outdated
+    """
+    try:
+        with open(filename, 'rb') as f:
+            if pickle.load(f) != key:
+                logging.info(f"Dataset cache '{filename}' is outdated")
+                return None
+            messages = pickle.load(f)
+            data = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as err:
+        logging.warning(f"Failed to read dataset cache '{filename}': {err}")
+        return None
+
+    logging.info(f"Using cached dataset '{filename}'")
+    for level, msg in messages:
+        logging.log(level, msg)
+    return data
+
+
+def savedatasetcache(filename, key, data, records=()):
+    """
+    Save the dataset into the cache file
+    :param records: log records from reading the dataset. The warnings and
+                    errors are stored to be logged again by loaddatasetcache().
+    """
+    logging.info(f"Saving dataset cache '{filename}'")
+    messages = [(record.levelno, record.getMessage()) for record in records if record.levelno >= logging.WARNING]
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    tmpfile = filename.with_suffix('.tmp')
+    with open(tmpfile, 'wb') as f:
+        pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(messages, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmpfile.replace(filename)
+
+
+class LogCapture(logging.Handler):
+    """
+    Context manager collecting the log records emitted by the current thread
+    while it is active. Records of other threads, such as the ticket uploads,
+    are not collected. The records are still handled by the other log handlers.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.thread = threading.get_ident()
+
+    def emit(self, record):
+        if record.thread == self.thread:
+            self.records.append(record)
+
+    def __enter__(self):
+        self.thread = threading.get_ident()
+        logging.getLogger().addHandler(self)
+        return self
+
+    def __exit__(self, *exc):
+        logging.getLogger().removeHandler(self)
+
+
+class MarkdownCache:
+    """
+    Persistent cache of the migratetexttomd() conversions, keyed by a hash of
+    the text and the conversion parameters. The messages logged by a conversion
+    are stored with the result and logged again when the result is reused. The
+    least recently used entries are evicted when the cache exceeds 'maxsize'
+    characters.
+    """
+
+    def __init__(self, filename, maxsize=MARKDOWN_CACHE_SIZE):
+        self.filename = filename
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.contexts = {}
+        # Entries added since the last takeadded(), if tracked
+        self.added = None
+
+        # The cache is invalidated when the script changes
+        stat = pathlib.Path(__file__).stat()
+        self.version = (TOOLVERSION, stat.st_size, stat.st_mtime_ns)
+
+        try:
+            with open(filename, 'rb') as f:
+                version, entries = pickle.load(f)
+            if version == self.version:
+                self.entries = entries
+                self.size = sum(self.entrysize(v) for v in entries.values())
+        except FileNotFoundError:
+            pass
+        except Exception as err:
+            logging.warning(f"Failed to read markdown cache '{filename}': {err}")
+
+    @staticmethod
+    def entrysize(entry):
+        return len(entry[0]) + sum(len(m[2]) for m in entry[1])
+
+    def context(self, migrate_at, is_wiki, wikipages, documents, urlrewriter):
+        """ Return the hash of the conversion parameters """
+        key = (migrate_at, is_wiki, id(wikipages), id(documents), id(urlrewriter))
+        context = self.contexts.get(key)
+        if context is None:
+            context = hashlib.sha1(repr((
+                migrate_at, is_wiki, sorted(wikipages or ()),
+                sorted((k, v['filename']) for k, v in (documents or {}).items()),
+                urlrewriter.key if urlrewriter else None,
+            )).encode()).digest()
+            # Keep the objects to prevent their ids from being reused
+            self.contexts[key] = (context, wikipages, documents, urlrewriter)
+            return context
+        return context[0]
+
+    def migratetexttomd(self, text, ref, migrate_at=False, is_wiki=True, wikipages=None, documents=None,
+                        urlrewriter=None, stats=None):
+        """ Cached migratetexttomd() """
+        if not text:
+            return text
+
+        context = self.context(migrate_at, is_wiki, wikipages, documents, urlrewriter)
+        key = hashlib.sha1(context + text.encode()).digest()
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            result, messages = entry
+            for level, hasref, msg in messages:
+                logging.log(level, ref + msg if hasref else msg)
+            return result
+
+        self.misses += 1
+        with LogCapture() as capture:
+            result, timedout = texttomd(text, ref, migrate_at=migrate_at, is_wiki=is_wiki,
+                                        wikipages=wikipages, documents=documents, urlrewriter=urlrewriter,
+                                        stats=stats)
+
+        # A conversion cut by the time budget could complete on a later run
+        if timedout:
+            return result
+
+        # Store the messages without the ref, which differs between identical texts
+        messages = []
+        for record in capture.records:
+            msg = record.getMessage()
+            if msg.startswith(ref):
+                messages.append((record.levelno, True, msg[len(ref):]))
+            else:
+                messages.append((record.levelno, False, msg))
+        self.store(key, (result, tuple(messages)))
+        return result
+
+    def store(self, key, entry):
+        """ Add an entry, evicting the least recently used entries if full """
+        if key in self.entries:
+            self.size -= self.entrysize(self.entries.pop(key))
+        self.entries[key] = entry
+        self.size += self.entrysize(entry)
+        while self.size > self.maxsize:
+            self.size -= self.entrysize(self.entries.popitem(last=False)[1])
+        if self.added is not None:
+            self.added[key] = entry
+
+    def takeadded(self):
+        """
+        Return the entries added and the hits and misses counted since the last
+        call, and reset them. Used by the worker processes of --jobs to return
+        their cache updates for merge().
+        """
+        added, hits, misses = self.added, self.hits, self.misses
+        self.added, self.hits, self.misses = {}, 0, 0
+        return added, hits, misses
+
+    def merge(self, added, hits, misses):
+        """ Add the entries and counts returned by takeadded() of another cache """
+        for key, entry in added.items():
+            self.store(key, entry)
+        self.hits += hits
+        self.misses += misses
+
+    def save(self):
+        """ Save the cache file """
+        logging.info(f"Markdown cache: {self.hits} hits, {self.misses} misses")
+        if not self.misses:
+            return
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        tmpfile = self.filename.with_suffix('.tmp')
+        with open(tmpfile, 'wb') as f:
+            pickle.dump((self.version, self.entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmpfile.replace(self.filename)
+
+
+def configurlrewriter(config, data):
+    """ Return the UrlRewriter for the repo in config, or None if not set """
+    if 'repo' not in config:
+        return None
+    return UrlRewriter(data["spaces"][0]["name"].lower(), "https://github.com/" + config['repo'])
+
+
+def markdowncache(config, options):
+    """ Return the markdown conversion cache, or None if disabled """
+    if options.no_cache:
+        return None
+    return MarkdownCache(pathlib.Path(config.get('cachedir', CACHE_DIR), MARKDOWN_CACHE_FILE))
+
+
 # -----------------------------------------------------------------------------
 #  MAIN
 #
@@ -1411,6 +3000,8 @@ def main():
     parser.add_argument('--verbose', '-v', action="count", default=0, help='verbose logging')
     parser.add_argument('--config', '-c', metavar="JSON", help="Configuration file")
     parser.add_argument('--auth', '-a', metavar="JSON", help='Authentication config')
+    parser.add_argument('--no-cache', action="store_true", help="Do not use the parsed dataset and markdown caches")
+    parser.add_argument('--parse-jobs', metavar="N", type=int, default=1, help="Number of processes for parsing the dump file")
     subparser = parser.add_subparsers(dest="command", required=True, title="command", help="Command to execute")
 
     subcmd = subparser.add_parser('dump', help="Dump assembla database tables")
@@ -1419,7 +3010,7 @@ def main():
     subcmd.add_argument('--include', '-i', action="append", help="Fields to include")
     subcmd.add_argument('--exclude', '-x', action="append", help="Fields to exclude")
     subcmd.add_argument('--limit', '-l', type=int, help="Limit the number of lines")
-    subcmd.set_defaults(func=cmd_dump)
+    subcmd.set_defaults(func=cmd_dump, loadtables=lambda o: {o.table} if o.table else None)
 
     subcmd = subparser.add_parser('lstickets', help="List tickets")
     subcmd.add_argument('--quiet', '-q', action="store_true", help="Do not print tickets")
@@ -1428,12 +3019,16 @@ def main():
     subcmd.add_argument('--comments', '-c', action="store_true", help="Show comment fields")
     subcmd.add_argument('--content-before', '-B', required=False, help="Dump ticket contents before convert")
     subcmd.add_argument('--content-after', '-A', required=False, help="Dump ticket contents after convert")
+    subcmd.add_argument('--rule-stats', action="store_true",
+                        help="Print time and counts of the markdown conversion rules")
+    subcmd.add_argument('--jobs', '-j', metavar="N", type=int, default=1,
+                        help="Number of processes for converting the tickets")
     subcmd.add_argument('issue', nargs="*", help="Issue to print")
-    subcmd.set_defaults(func=cmd_lstickets)
+    subcmd.set_defaults(func=cmd_lstickets, loadtables=TICKET_TABLES)
 
     subcmd = subparser.add_parser('lsusers', help="List users")
     subcmd.add_argument('--table', '-t', action="append", help="Show only users from this table")
-    subcmd.set_defaults(func=cmd_lsusers)
+    subcmd.set_defaults(func=cmd_lsusers, loadtables=lambda o: o.table)
 
     subcmd = subparser.add_parser('lswiki', help="List wiki pages")
     subcmd.add_argument('--quiet', '-q', action="store_true", help="Do not print tickets")
@@ -1442,26 +3037,59 @@ def main():
     subcmd.add_argument('--tables', '-t', action="store_true", help="Show as tables")
     subcmd.add_argument('--content-before', '-B', required=False, help="Dump wiki contents before convert")
     subcmd.add_argument('--content-after', '-A', required=False, help="Dump wiki contents after convert")
-    subcmd.set_defaults(func=cmd_lswiki)
+    subcmd.set_defaults(func=cmd_lswiki, loadtables=WIKI_TABLES)
+
+    subcmd = subparser.add_parser('mdbenchmark', help="Benchmark markdown conversion of malformed texts")
+    subcmd.add_argument('--size', type=int, default=20000, help="Length of the texts. Default 20000")
+    subcmd.add_argument('--budget', type=float, default=MARKDOWN_TIME_BUDGET,
+                        help=f"Time budget in seconds, 0 is unlimited. Default {MARKDOWN_TIME_BUDGET}")
+    subcmd.set_defaults(func=cmd_mdbenchmark, loadtables=())
+
+    subcmd = subparser.add_parser('parsebenchmark', help="Benchmark peak memory of parsing dump files")
+    subcmd.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 500000],
+                        help="Rows in the generated dump files. Default 10000 100000 500000")
+    subcmd.set_defaults(func=cmd_parsebenchmark, loadtables=())
+
+    subcmd = subparser.add_parser('timebenchmark', help="Benchmark the conversion of the dump timestamps")
+    subcmd.add_argument('--repeat', type=int, default=3, help="Runs of each conversion, the best is shown. Default 3")
+    subcmd.set_defaults(func=cmd_timebenchmark, loadtables=TICKET_TABLES)
 
     subcmd = subparser.add_parser('ticketsconvert', help="Convert tickets to GitHub repo")
     subcmd.add_argument('--dry-run', '-n', action="store_true", help="Only check the data")
     subcmd.add_argument('--mk1', action="store_true", help="Use the old GitHub importer")
-    subcmd.set_defaults(func=cmd_ticketsconvert)
+    subcmd.add_argument('--jobs', '-j', metavar="N", type=int, default=1,
+                        help="Number of processes for converting the tickets")
+    subcmd.set_defaults(func=cmd_ticketsconvert, loadtables=TICKET_TABLES)
 
     subcmd = subparser.add_parser('userscrape', help="Scrape users from Assembla")
     subcmd.add_argument('out', help="Output file to store users scrape")
-    subcmd.set_defaults(func=cmd_userscrape)
+    subcmd.add_argument('--workers', type=int, default=ASSEMBLA_API_WORKERS,
+                        help=f"Number of concurrent requests. Default {ASSEMBLA_API_WORKERS}")
+    subcmd.add_argument('--rate', type=float, default=ASSEMBLA_API_RATE,
+                        help=f"Max requests per second, 0 is unlimited. Default {ASSEMBLA_API_RATE}")
+    subcmd.add_argument('--no-http-cache', action="store_true",
+                        help="Do not use or update the cache of the API responses")
+    subcmd.add_argument('--space-members', action="store_true",
+                        help="Fetch the users from the space member list, and only fetch other users one by one")
+    subcmd.set_defaults(func=cmd_userscrape, loadtables=None)
 
     subcmd = subparser.add_parser('wikiconvert', help="Convert to GitHub wiki repo")
     subcmd.add_argument('dir', help="Working dir for wiki git repo")
     subcmd.add_argument('--dry-run', '-n', action="store_true", help="Do not commit any data")
     subcmd.add_argument('--no-convert', action="store_true", help="Do not commit markdown conversion changes")
-    subcmd.set_defaults(func=cmd_wikiconvert)
+    subcmd.add_argument('--fast-import', action="store_true",
+                        help="Write the commits with git fast-import instead of the working tree")
+    subcmd.set_defaults(func=cmd_wikiconvert, loadtables=WIKI_TABLES)
 
     subcmd = subparser.add_parser('wikiscrape', help="Scrape wiki from Assembla")
     subcmd.add_argument('out', help="Output file to store wiki scrape")
-    subcmd.set_defaults(func=cmd_wikiscrape)
+    subcmd.add_argument('--workers', type=int, default=ASSEMBLA_API_WORKERS,
+                        help=f"Number of concurrent requests. Default {ASSEMBLA_API_WORKERS}")
+    subcmd.add_argument('--rate', type=float, default=ASSEMBLA_API_RATE,
+                        help=f"Max requests per second, 0 is unlimited. Default {ASSEMBLA_API_RATE}")
+    subcmd.add_argument('--no-http-cache', action="store_true",
+                        help="Do not use or update the cache of the API responses")
+    subcmd.set_defaults(func=cmd_wikiscrape, loadtables=WIKI_TABLES)
 
     options = parser.parse_args()
 
@@ -1512,99 +3140,32 @@ def main():
     config['auth'] = auth
 
     # -------------------------------------------------------------------------
-    #  Read the dump file
-
-    logging.info(f"Parsing dumpfile '{config['dumpfile']}'")
-    with open(config['dumpfile'], encoding='utf8') as filereader:
-        data = DictPlus()
-        tablefields = {}
-
-        # for each line determine the assembla object type, read all attributes to dict using the mappings
-        # assign a key for each object which is used to link github <-> assembla objects to support updates
-        for linenum, line, table, row in filereadertoassemblaobjectgenerator(filereader, tablefields):
-
-            # Collect the file data
-            data.setdefault(table, [])
-            data.get(table).append(row)
-
-        logging.info(f"    Parsed {linenum} lines")
-
-    # -------------------------------------------------------------------------
-    #  Index the data
-
-    logging.info("Indexing the data")
-
-    # Store the fields for the tables
-    data['_fields'] = tablefields
-
-    # Convert table list to dicts indexed by key using keymap
-    data['_index'] = indexassembladata(data, {
-
-        # None key specified index key for all unlisted tables.
-        # None: 'id',
-
-        # Tables to index
-        'wiki_pages': 'id',
-        'milestones': 'id',
-        'ticket_statuses': 'id',
-        'workflow_property_defs': 'id',
-        'wiki_page_versions': 'id',
-        'tag_names': 'id',
-        'documents': 'id',
-    })
-
-    # -------------------------------------------------------------------------
-    #  Read the wiki dump data
-
-    if 'wikidump' in config:
-
-        logging.info(f"Parsing wiki dumpfile '{config['wikidump']}'")
-
-        with open(config['wikidump'], encoding='utf8') as filereader:
-            wikidata = json.load(filereader)
-
-        # Merge the file data with the main assembla database
-        mergewikidata(wikidata, data['_index']['wiki_page_versions'])
-
-    # -------------------------------------------------------------------------
-    #  UserID scrape
-
-    logging.info("Scraping for user IDs")
-
-    users = scrapeusers(data)
-    data["_index"]["_users"] = users
-    data["_users"] = list(users.values())
-
-    # -------------------------------------------------------------------------
-    #  Read the user dump data
-
-    if 'userdump' in config:
-
-        logging.info(f"Parsing user dumpfile '{config['userdump']}'")
-
-        with open(config['userdump'], encoding='utf8') as filereader:
-            userdata = json.load(filereader)
-
-        # Merge the file data with the main assembla database
-        mergeuserdata(userdata, data['_index']['_users'])
-
-    # -------------------------------------------------------------------------
-    # Initialize the URL replace regexps
-
-    if 'repo' in config:
-        space = data["spaces"][0]["name"].lower()
-        url = "https://github.com/" + config['repo']
-
-        def replace(inlist, outlist):
-            for k in inlist:
-                k0 = k[0].replace('{ASSEMBLA_SPACE}', space)
-                k1 = k[1].replace('{GITHUB_URL}', url)
-                outlist.append((re.compile(k0), k1))
-
-        global _URL_RE, _URL_RE_WIKI, _URL_RE_TICKETS
-        replace(URL_RE_REPLACE, _URL_RE)
-        replace(URL_RE_REPLACE_WIKI, _URL_RE_WIKI)
-        replace(URL_RE_REPLACE_TICKETS, _URL_RE_TICKETS)
+    #  Read the Assembla data
+
+    # Get the tables needed by the command. 'spaces' is always needed.
+    tables = options.loadtables
+    if callable(tables):
+        tables = tables(options)
+    if tables is not None:
+        tables = set(tables) | {'spaces'}
+        logging.info(f"Reading tables {', '.join(sorted(tables))}")
+
+    data = None
+    cachename = 'dataset.pickle'
+    if tables is not None:
+        cachename = f"dataset-{hashlib.sha1(str(sorted(tables)).encode()).hexdigest()[:12]}.pickle"
+    cachefile = pathlib.Path(config.get('cachedir', CACHE_DIR), cachename)
+    cachekey = datasetcachekey(config, tables)
+    if not options.no_cache:
+        data = loaddatasetcache(cachefile, cachekey)
+
+    if data is None:
+        with LogCapture() as capture:
+            data = readassembladata(config, options, tables)
+        if not options.no_cache:
+            savedatasetcache(cachefile, cachekey, data, capture.records)
+
+    data.bindrelations()
 
     # -------------------------------------------------------------------------
     # Run the command
@@ -1672,35 +3233,68 @@ def cmd_userscrape(parser, options, config, auth, data):
     # Check for required auth fields
     check_authconfig(auth, parser, ('assembla_key', 'assembla_secret'))
 
-    headers = {
-        'X-Api-Key': auth['assembla_key'],
-        'X-Api-Secret': auth['assembla_secret'],
-    }
-
-    # Fetch all user info
-    out = []
-    for v in data["_index"]["_users"].values():
-
-        # Brute force to ensure to not hit any rate limits
-        time.sleep(0.1)
+    api = AssemblaApi(config, auth, rate=options.rate, workers=options.workers,
+                      cache=httpcachedir(config, options))
+    failed = {}
 
+    def fetch(v):
         logging.info(f"Fetching user '{v['id']}'")
-
-        req = requests.get(
-            f"https://api.assembla.com/v1/users/{v['id']}.json",
-            headers=headers,
-        )
+        try:
+            req = api.get(f"users/{v['id']}.json")
+        except requests.RequestException as e:
+            failed[v['id']] = str(e)
+            return None
         if req.status_code != 200:
-            logging.error(f"   Failed to fetch: Error code {req.status_code}")
-            continue
-        jsdata = req.json()
-
-        out.append(jsdata)
+            logging.error(f"   Failed to fetch user '{v['id']}': Error code {req.status_code}")
+            failed[v['id']] = f"Error code {req.status_code}"
+            return None
+        return req.json()
+
+    start = time.monotonic()
+    users = list(data["_index"]["_users"].values())
+
+    # Skip the users already fetched into the output by an interrupted run
+    output = ScrapeWriter(options.out)
+    done = set(v['id'] for v in output.entries)
+    if done:
+        logging.info(f"Resuming with {len(done)} users already in '{options.out}'")
+    users = [v for v in users if v['id'] not in done]
+
+    # Fetch the members of the spaces in bulk
+    members = {}
+    if options.space_members and users:
+        for space in data['spaces']:
+            logging.info(f"Fetching members of space '{space['id']}'")
+            try:
+                entries = api.getall(f"spaces/{space['id']}/users.json")
+            except requests.RequestException as e:
+                logging.error(f"   Failed to fetch space members: {e}")
+                entries = None
+            for v in entries or ():
+                members.setdefault(v['id'], v)
+        found = sum(1 for v in users if v['id'] in members)
+        logging.info(f"Found {found} of {len(users)} users in the space members")
+
+    # Fetch the info of the remaining users one by one
+    fetched = api.map(fetch, [v for v in users if v['id'] not in members])
+
+    # Save the results in the order of the users as they arrive
+    count = 0
+    for v in users:
+        jsdata = members[v['id']] if v['id'] in members else next(fetched)
+        if jsdata:
+            output.append(jsdata)
+            count += 1
+    logging.info(f"Fetched {count} of {len(users)} users in {time.monotonic() - start:.1f}s")
+    api.logstats()
+    if failed:
+        logging.error(f"Failed to fetch {len(failed)} users:")
+        for k in (v['id'] for v in users if v['id'] in failed):
+            logging.error(f"    {k}: {failed[k]}")
 
     # Save the entries to disk
     logging.info(f"Saving user data in '{options.out}'")
-    with open(options.out, 'w') as f:
-        json.dump(out, f)
+    output.close()
 
 
 # -----------------------------------------------------------------------------
@@ -1764,39 +3358,39 @@ def cmd_wikiscrape(parser, options, config, auth, data):
     # Check for required auth fields
     check_authconfig(auth, parser, ('assembla_key', 'assembla_secret'))
 
-    headers = {
-        'X-Api-Key': auth['assembla_key'],
-        'X-Api-Secret': auth['assembla_secret'],
-    }
+    api = AssemblaApi(config, auth, rate=options.rate, workers=options.workers,
+                      cache=httpcachedir(config, options))
 
     # Parse the wiki entries (making rich additions to objects in data) and
     # return the order of wiki pages
     wikiorder = wikiparser(data)
 
-    # Fetch all wiki pages
-    out = []
-    for v in wikiorder:
-
-        # Brute force to ensure to not hit any rate limits
-        time.sleep(0.1)
-
+    def fetch(v):
         logging.info(f"Fetching wiki page '{v['page_name']}'")
-
-        req = requests.get(
-            f"https://api.assembla.com/v1/spaces/{v['space_id']}/wiki_pages/{v['id']}/versions.json?per_page=40",
-            headers=headers,
-        )
-        if req.status_code != 200:
-            logging.error(f"   Failed to fetch: Error code {req.status_code}")
-            continue
-        jsdata = req.json()
-
-        out.append(jsdata)
+        try:
+            return api.getall(f"spaces/{v['space_id']}/wiki_pages/{v['id']}/versions.json")
+        except requests.RequestException as e:
+            logging.error(f"   Failed to fetch wiki page '{v['page_name']}': {e}")
+            return None
+
+    # Skip the wiki pages already fetched into the output by an interrupted run
+    output = ScrapeWriter(options.out)
+    done = set(v[0]['wiki_page_id'] for v in output.entries if v)
+    if done:
+        logging.info(f"Resuming with {len(done)} wiki pages already in '{options.out}'")
+    wikiorder = [v for v in wikiorder if v['id'] not in done]
+
+    # Fetch all versions of all wiki pages. The results are saved in wiki page
+    # order as they arrive
+    for jsdata in api.map(fetch, wikiorder):
+        if jsdata is not None:
+            output.append(jsdata)
+
+    api.logstats()
 
     # Save the entries to disk
     logging.info(f"Saving wiki scrape data in '{options.out}'")
-    with open(options.out, 'w') as f:
-        json.dump(out, f)
+    output.close()
 
 
 # -----------------------------------------------------------------------------
@@ -1816,12 +3410,30 @@ def cmd_wikiconvert(parser, options, config, auth, data):
     repo = None
     if not options.dry_run:
 
-        url = 'https://github.com/' + config['repo'] + '.git'
-        logging.info(f"Checking out '{url}'")
+        if pathlib.Path(wikidir, '.git').exists():
+            logging.info(f"Resuming conversion in existing repo '{wikidir}'")
+            repo = git.Repo(wikidir)
+        else:
+            url = 'https://github.com/' + config['repo'] + '.git'
+            logging.info(f"Checking out '{url}'")
 
-        repo = git.Repo.clone_from(url, wikidir)
+            repo = git.Repo.clone_from(url, wikidir)
         wikirepo = pathlib.Path(repo.working_tree_dir)
 
+    # Find the wiki versions which have already been committed to the repo
+    done = set()
+    convert = not options.no_convert
+    if repo:
+        converted = wikiconvertedversions(repo)
+        done = {v['id'] for v in data['wiki_page_versions'] if str(v['id']) in converted}
+        if done:
+            logging.info(f"Skipping {len(done)} wiki page versions already in the repo")
+
+            # Don't repeat the conversion commit if nothing has been added since
+            fixedup = repo.head.commit.message == WIKI_FIXUP_MESSAGE
+            if len(done) == len(data['wiki_page_versions']) and fixedup:
+                convert = False
+
     # Parse the wiki entries (making rich additions to objects in data) and
     # return the order of wiki pages
     wikiorder = wikiparser(data)
@@ -1831,7 +3443,25 @@ def cmd_wikiconvert(parser, options, config, auth, data):
 
     # Iterate over each wiki page version in order from old to new and get
     # the data required for git commit
-    for commit in wikicommitgenerator(data['wiki_page_versions'], wikiorder):
+    commits = wikicommitgenerator(data['wiki_page_versions'], wikiorder, skip=done)
+
+    # Skip commit of convert if --no-convert is used
+    if not convert:
+        commits = filter(lambda v: v['name'] != 'ALL', commits)
+
+    # Record the wiki page version in the commit message to be able to resume
+    def addtrailer(commit):
+        if commit['id'] is not None:
+            trailer = f"{WIKI_VERSION_TRAILER}: {commit['id']}"
+            commit['message'] = f"{commit['message']}\n\n{trailer}" if commit['message'] else trailer
+        return commit
+    commits = map(addtrailer, commits)
+
+    if repo and options.fast_import:
+        wikifastimport(repo, commits)
+        commits = ()
+
+    for commit in commits:
 
         name = f"{commit['name']}:{commit['version']}"
         logging.debug(f"Converting page '{name}'")
@@ -1854,13 +3484,6 @@ def cmd_wikiconvert(parser, options, config, auth, data):
         actor = git.Actor(commit['author_name'], commit['author_email'])
         date = commit['date'].astimezone(timezone.utc).replace(tzinfo=None).isoformat()
 
-        # The 'ALL' is the last entry where the pages have been converted to GitHub markdown
-        if commit['name'] == 'ALL':
-
-            # Skip commit of convert if --no-convert is used
-            if options.no_convert:
-                continue
-
         # Commit the changes
         if repo:
             repo.index.commit(
@@ -1888,28 +3511,31 @@ def cmd_lstickets(parser, options, config, auth, data):
     # Prep the dataset for conversion
     ticketparser(data)
 
+    # The cache is bypassed when collecting statistics of all conversions
+    stats = RuleStats() if options.rule_stats else None
+    cache = markdowncache(config, options) if not stats else None
+    urlrewriter = configurlrewriter(config, data)
+
     before = {}
     after = {}
 
-    for ticket in sorted(data['tickets'], key=lambda v: v['number']):
+    tickets = [
+        ticket for ticket in sorted(data['tickets'], key=lambda v: v['number'])
+        if not options.issue or str(ticket['number']) in options.issue
+    ]
 
-        if options.issue and str(ticket['number']) not in options.issue:
-            continue
+    # Get the timeline for the tickets and convert them to github data
+    for ticket, changes, issue, ghchanges in ticketconversiongenerator(
+            tickets, data, wikipages, cache=cache, urlrewriter=urlrewriter, stats=stats, jobs=options.jobs):
 
         # Save the description before conversion
         before[f"#{ticket['number']} Description"] = ticket['description']
 
-        # Get the timeline for the ticket
-        changes = tickettimelinegenerator(ticket)
-
         # Save the comments before conversion
         for i, change in enumerate(changes):
             if change.get('body'):
                 before[f"#{ticket['number']} Comment {i}"] = change['body']
 
-        # Convert the issue to github data
-        issue, ghchanges = tickettogithub(ticket, changes, wikipages=wikipages, documents=data['_index']['documents'])
-
         # Save the description after conversion
         after[f"#{ticket['number']} Description"] = issue['body']
 
@@ -2002,6 +3628,12 @@ def cmd_lstickets(parser, options, config, auth, data):
 
         tprint()
 
+    if cache:
+        cache.save()
+
+    if stats:
+        stats.report()
+
     # Dump ticket comments to files (for comparisons)
     if options.content_before:
         dumpdict(options.content_before, before, 'Ticket ')
@@ -2009,6 +3641,152 @@ def cmd_lstickets(parser, options, config, auth, data):
         dumpdict(options.content_after, after, 'Ticket ')
 
 
+# -----------------------------------------------------------------------------
+#  Dump parsing and timestamp benchmarks
+def peakrss():
+    """ Return the peak resident memory of this process in bytes """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def parsebenchmarkworker(filename):
+    """
+    Parse the dump file without keeping the rows. This is run in a fresh
+    process for each file by cmd_parsebenchmark().
+    :returns: tuple (rows, rss, elapsed), where rss is the growth of the peak
+              resident memory while parsing
+    """
+    rss = peakrss()
+    start = time.perf_counter()
+    rows = 0
+    with open(filename, encoding='utf8') as filereader:
+        for entry in filereadertoassemblaobjectgenerator(filereader, {}):
+            rows += 1
+    return (rows, peakrss() - rss, time.perf_counter() - start)
+
+
+def cmd_parsebenchmark(parser, options, config, auth, data):
+
+    if resource is None:
+        logging.error("The peak memory cannot be measured on this platform")
+        return
+
+    fields = ['id', 'comment', 'ticket_id', 'user_id', 'created_on', 'updated_at', 'rendered']
+    table = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for count in options.rows:
+            # Dump file of ticket comments, which are the bulk of a real dump
+            filename = pathlib.Path(tmpdir, f'dump-{count}.js')
+            with open(filename, 'w', encoding='utf8') as f:
+                f.write(f"ticket_comments:fields, {json.dumps(fields)}\n")
+                for i in range(count):
+                    comment = f"Comment {i} " + "lorem ipsum " * (i % 50)
+                    row = [i, comment, i // 10, f"user{i % 100}", "2020-01-02T03:04:05+00:00",
+                           "2020-01-02T03:04:05+00:00", None]
+                    f.write(f"ticket_comments, {json.dumps(row)}\n")
+
+            logging.info(f"Parsing {count} rows")
+            # Each file in a new process, as the peak memory cannot be reset
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                rows, rss, elapsed = executor.submit(parsebenchmarkworker, filename).result()
+            size = filename.stat().st_size
+            table.append((rows, size / 1e6, rss / 1e6, elapsed))
+            filename.unlink()
+
+    print(tabulate(table, headers=('Rows', 'Dump size (MB)', 'Peak memory growth (MB)', 'Time (s)'),
+                   floatfmt=('', '.1f', '.1f', '.2f')))
+
+
+def cmd_timebenchmark(parser, options, config, auth, data):
+
+    # The timestamps of all rows, as converted by the parsers before the
+    # timestamps were converted on demand
+    texts = [
+        row[column] for table, rows in data.items() if not table.startswith('_') and isinstance(rows, list)
+        for row in rows for column in ('created_at', 'updated_at', 'created_on', 'completed_date')
+        if row.get(column)
+    ]
+    logging.info(f"Converting {len(texts)} timestamps, {len(set(texts))} distinct")
+
+    def cachedisotime(texts):
+        # Start each run with an empty cache
+        isotime.cache_clear()
+        return [isotime(t) for t in texts]
+
+    cases = {
+        'datetime.fromisoformat()': lambda: [datetime.fromisoformat(t) for t in texts],
+        'isotime()': lambda: cachedisotime(texts),
+        'githubtime() of datetime': lambda: [githubtime(datetime.fromisoformat(t)) for t in texts],
+        'githubtime() of ISO string': lambda: [githubtime(t) for t in texts],
+    }
+
+    table = []
+    for name, fn in cases.items():
+        elapsed = []
+        for i in range(options.repeat):
+            start = time.perf_counter()
+            fn()
+            elapsed.append(time.perf_counter() - start)
+        best = min(elapsed)
+        table.append((name, best, best / max(len(texts), 1) * 1e6))
+
+    print(tabulate(table, headers=('Conversion', 'Time (s)', 'Per timestamp (us)'),
+                   floatfmt=('', '.3f', '.2f')))
+
+
+# -----------------------------------------------------------------------------
+#  Markdown conversion benchmark
+def cmd_mdbenchmark(parser, options, config, auth, data):
+
+    # Malformed texts making the conversion regexes backtrack
+    n = options.size
+    cases = {
+        'Unclosed [[': '[[' * (n // 2),
+        'Unclosed [[x|': '[[x|' * (n // 4),
+        'Unclosed [x](': '[x](' * (n // 4),
+        'Unclosed <pre>': '<pre>' * (n // 5),
+        'Unclosed {{{': '{{{' * (n // 3),
+        'Brackets': '[' * n,
+        'Bangs': '!a' * (n // 2),
+        'At signs': 'a@' * (n // 2),
+        'Pipes': '|a' * (n // 2),
+        'Stars': '**a\n' * (n // 4),
+        'URL': 'http://' + 'a.' * (n // 2),
+    }
+    # A few of each, to stay below MARKDOWN_MAX_UNCLOSED
+    few = MARKDOWN_MAX_UNCLOSED // 2
+    cases.update({
+        'Few unclosed [[x|': '[[x|' * few + 'x' * n,
+        'Few unclosed [x](': '[x](' * few + 'x' * n,
+        'Few unclosed <pre>': ('<pre>' + 'x' * (n // few)) * few,
+    })
+
+    urlrewriter = configurlrewriter(config, data)
+    logging.info(f"Converting {len(cases)} texts of {n} characters with {options.budget} s time budget")
+
+    # The conversion warnings would flood the output
+    logging.disable(logging.WARNING)
+    table = []
+    try:
+        for name, text in cases.items():
+            for is_wiki in (False, True):
+                stats = RuleStats()
+                start = time.perf_counter()
+                migratetexttomd(text, name, migrate_at=True, is_wiki=is_wiki, urlrewriter=urlrewriter,
+                                stats=stats, budget=options.budget)
+                elapsed = time.perf_counter() - start
+                conversion = 'simple' if 'simpletexttomd' in stats.rules else 'full'
+                table.append((name, 'wiki' if is_wiki else 'ticket', len(text), conversion, elapsed))
+    finally:
+        logging.disable(logging.NOTSET)
+
+    print(tabulate(table, headers=('Text', 'Mode', 'Length', 'Conversion', 'Time (s)'),
+                   floatfmt=('', '', '', '', '.3f')))
+    print(f"\nWorst case: {max(v[-1] for v in table):.3f} s")
+
+
 # -----------------------------------------------------------------------------
 #  Tickets conversion
 def cmd_ticketsconvert(parser, options, config, auth, data):
@@ -2102,169 +3880,155 @@ def cmd_ticketsconvert(parser, options, config, auth, data):
 
     logging.info('Converting tickets -> issues...')
 
-    tick = 0
+    cache = markdowncache(config, options)
+    urlrewriter = configurlrewriter(config, data)
+
+    tickets = []
     for ticket in sorted(data['tickets'], key=lambda v: v['number']):
         key = ticket['number']
-        logging.debug(f"{colorama.Fore.GREEN}Ticket #{key}{colorama.Style.RESET_ALL}")
-
         if repo:
             githubissue = findfirst(lambda v: v.number == key, github_issues)
             if githubissue:
                 logging.info(f"    Skipping existing issue {key}")
                 continue
+        tickets.append(ticket)
 
-        # Get the timeline changes for the ticket
-        changes = tickettimelinegenerator(ticket)
-
-        # Convert the issue to github data
-        ghissue, ghchanges = tickettogithub(ticket, changes, wikipages=wikipages, documents=data['_index']['documents'])
-
-        # Find the GH milestone
-        milestone = ghissue['milestone']
-        ghmilestone = findfirst(lambda v: v.title == milestone, github_milestones)
-        if ghmilestone:
-            ghmilestone = ghmilestone.number
-
-        #   "issue": {
-        #     "title": "Imported from some other system",
-        #     "body": "...",
-        #     "created_at": "2014-01-01T12:34:58Z",
-        #     "closed_at": "2014-01-02T12:24:56Z",
-        #     "updated_at": "2014-01-03T11:34:53Z",
-        #     "assignee": "jonmagic",
-        #     "milestone": 1,
-        #     "closed": true,
-        #     "labels": [
-        #       "bug",
-        #       "low"
-        #     ]
-        #   },
-        issue = {
-            'title': ghissue['title'],
-            'body': ghissue['annotation'] + '\n\n' + ghissue['body'],
-            'created_at': ghissue['created_at'],
-            'updated_at': ghissue['updated_at'],
-            'assignee': None,  # Don't want to migrate assignee
-            'milestone': ghmilestone,
-            'closed': ghissue['closed'],
-            'labels': list(ghissue['labels']),
-        }
-        if ghissue['closed']:
-            issue['closed_at'] = ghissue['closed_at']
-
-        #    "comments": [
-        #    {
-        #      "created_at": "2014-01-02T12:34:56Z",
-        #      "body": "talk talk"
-        #    }
-        #    ]
-        comments = []
-        for change in ghchanges:
-
-            if 'annotation' not in change:
-                continue
+    # Setup GitHub POST request data
+    url = f"https://api.github.com/repos/{config['repo']}/import/issues"
+    gauth = (auth['username'], auth['password'])
+    headers = {
+        'Accept': 'application/vnd.github.golden-comet-preview+json'
+    }
 
-            body = ''
-            if change.get('body'):
-                body = '\n\n' + change.get('body')
+    # Set to stop the conversion on upload failure
+    stop = threading.Event()
+    tick = 0
 
-            comments.append({
-                'created_at': change['date'],
-                'body': change['annotation'] + body,
-            })
+    def uploadissue(key, jdata):
+        """ Upload the issue for ticket number key and wait for GitHub to import it """
+        nonlocal tick
 
-        # Setup GitHub POST request data
-        url = f"https://api.github.com/repos/{config['repo']}/import/issues"
-        gauth = (auth['username'], auth['password'])
-        headers = {
-            'Accept': 'application/vnd.github.golden-comet-preview+json'
-        }
-        jdata = {
-            'issue': issue,
-            'comments': comments,
-        }
+        logging.info(f"  Uploading ticket #{key}")
 
-        if repo:
+        # Post the issue data
+        res = requests.post(url, json=jdata, auth=gauth, headers=headers)
+        resjson = res.json()
+
+        # print(f"    URL:     {url}")
+        # print(f"    RETURN:  {res.status_code}")
+        # print(f"    HEADERS: {res.headers}")
+        # print(f"    JSON:    {resjson}")
+
+        if res.status_code != 202:
+            logging.error(f"Failed to upload ticket #{key}. Status code {res.status_code} returned")
+            if 'message' in resjson:
+                logging.error(f"Response text: {resjson['message']}")
+            stop.set()
+            return
+
+        # Make sure that we have enough rate limits requests remaining
+        remain = int(res.headers.get('X-RateLimit-Remaining', '0'))
+        reset = datetime.fromtimestamp(int(res.headers['X-RateLimit-Reset']), timezone.utc).astimezone()
+        if time.time() > tick + 60:
+            logging.info(f"  Remaining ratelimit quota: {remain} (will reset at {str(reset)})")
+            tick = time.time()
+        if remain < 100:
+            logging.error(f"Rate limits exceeded. Aborting conversion. Please retry after {str(reset)}")
+            stop.set()
+            return
+
+        # Poll GitHub to get the issue ID
+        delay = POLL_INITIAL
+        failcount = 0
+        print("   ", end='')
+        while resjson['status'] == 'pending':
 
-            logging.info(f"  Uploading ticket #{key}")
+            # Sleep an exponential amount of time
+            time.sleep(delay)
+            delay = min(delay * POLL_FACTOR, POLL_MAX_DELAY)
 
-            # Post the issue data
-            res = requests.post(url, json=jdata, auth=gauth, headers=headers)
-            resjson = res.json()
+            # Fetch the current status
+            print(".", end='')
+            res = requests.get(resjson['url'], auth=gauth, headers=headers)
+
+            try:
+                resjson = res.json()
+                jsonfail = False
+            except json.decoder.JSONDecodeError as err:
+                resjson = {}
+                jsonfail = str(err)
 
             # print(f"    URL:     {url}")
             # print(f"    RETURN:  {res.status_code}")
             # print(f"    HEADERS: {res.headers}")
             # print(f"    JSON:    {resjson}")
 
-            if res.status_code != 202:
-                logging.error(f"Failed to upload ticket #{key}. Status code {res.status_code} returned")
+            if res.status_code != 200 or jsonfail:
+                print('F', end='')
+                logging.error(f"Failed to get status of ticket #{key}. Status code {res.status_code} returned")
+                logging.error(f"Headers: {res.headers}")
+                if jsonfail:
+                    logging.error(f"Could not load JSON: {jsonfail}")
                 if 'message' in resjson:
                     logging.error(f"Response text: {resjson['message']}")
+
+                # Ensure retries
+                failcount += 1
+                if failcount < POLL_MAX_FAILS:
+                    logging.warning("Retrying...")
+                    continue
                 break
 
-            # Make sure that we have enough rate limits requests remaining
-            remain = int(res.headers.get('X-RateLimit-Remaining', '0'))
-            reset = datetime.fromtimestamp(int(res.headers['X-RateLimit-Reset']), timezone.utc).astimezone()
-            if time.time() > tick + 60:
-                logging.info(f"  Remaining ratelimit quota: {remain} (will reset at {str(reset)})")
-                tick = time.time()
-            if remain < 100:
-                logging.error(f"Rate limits exceeded. Aborting conversion. Please retry after {str(reset)}")
-                return
-
-            # Poll GitHub to get the issue ID
-            delay = POLL_INITIAL
-            failcount = 0
-            print("   ", end='')
-            while resjson['status'] == 'pending':
-
-                # Sleep an exponential amount of time
-                time.sleep(delay)
-                delay = min(delay * POLL_FACTOR, POLL_MAX_DELAY)
-
-                # Fetch the current status
-                print(".", end='')
-                url = resjson['url']
-                res = requests.get(url, auth=gauth, headers=headers)
-
-                try:
-                    resjson = res.json()
-                    jsonfail = False
-                except json.decoder.JSONDecodeError as err:
-                    resjson = {}
-                    jsonfail = str(err)
-
-                # print(f"    URL:     {url}")
-                # print(f"    RETURN:  {res.status_code}")
-                # print(f"    HEADERS: {res.headers}")
-                # print(f"    JSON:    {resjson}")
-
-                if res.status_code != 200 or jsonfail:
-                    print('F', end='')
-                    logging.error(f"Failed to get status of ticket #{key}. Status code {res.status_code} returned")
-                    logging.error(f"Headers: {res.headers}")
-                    if jsonfail:
-                        logging.error(f"Could not load JSON: {jsonfail}")
-                    if 'message' in resjson:
-                        logging.error(f"Response text: {resjson['message']}")
-
-                    # Ensure retries
-                    failcount += 1
-                    if failcount < POLL_MAX_FAILS:
-                        logging.warning("Retrying...")
-                        continue
+        if res.status_code != 200:
+            stop.set()
+            return
+
+        # Get the github issue number and compare it against the expected ticket number
+        issueid = resjson['issue_url'].replace(resjson['repository_url'] + '/issues/', '')
+        print(f'  done, issue #{issueid}')
+
+        if int(issueid) != key:
+            logging.error(f"Did not get equal issue id from GitHub. Got issue {issueid} for Assembla ticket {key}")
+
+    def upload(key, jdata):
+        """ uploadissue() unless stopped. Any failure stops all following uploads. """
+        if stop.is_set():
+            return
+        try:
+            uploadissue(key, jdata)
+        except BaseException:
+            stop.set()
+            raise
+
+    # The issues are uploaded in ticket number order by a separate thread while
+    # the next tickets are converted. At most TICKET_UPLOAD_BACKLOG converted
+    # tickets are waiting for upload.
+    uploads = collections.deque()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as uploader:
+        try:
+            # Get the timeline changes for the tickets and convert them to github data
+            for ticket, changes, ghissue, ghchanges in ticketconversiongenerator(
+                    tickets, data, wikipages, cache=cache, urlrewriter=urlrewriter, jobs=options.jobs):
+                if stop.is_set():
                     break
+                key = ticket['number']
+                logging.debug(f"{colorama.Fore.GREEN}Ticket #{key}{colorama.Style.RESET_ALL}")
 
-            if res.status_code != 200:
-                break
+                jdata = githubimportdata(ghissue, ghchanges, github_milestones)
+
+                if repo:
+                    uploads.append(uploader.submit(upload, key, jdata))
+                    while len(uploads) > TICKET_UPLOAD_BACKLOG:
+                        uploads.popleft().result()
 
-            # Get the github issue number and compare it against the expected ticket number
-            issueid = resjson['issue_url'].replace(resjson['repository_url'] + '/issues/', '')
-            print(f'  done, issue #{issueid}')
+            while uploads:
+                uploads.popleft().result()
+        finally:
+            # Skip the remaining uploads on errors
+            stop.set()
 
-            if int(issueid) != ticket['number']:
-                logging.error(f"Did not get equal issue id from GitHub. Got issue {issueid} for Assembla ticket {ticket['number']}")
+    if cache:
+        cache.save()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,308 @@
+"""
+Tests of the AssemblaApi client against a fake Assembla server on localhost
+"""
+import argparse
+import hashlib
+import http.server
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+import assembla2github
+
+
+class FakeAssembla(http.server.ThreadingHTTPServer):
+    """
+    Assembla API server answering GET requests from 'responses', a dict of
+    path to the list of (status, body) answers of its successive requests.
+    The last answer is repeated. An answer (status, body, delay) is sent
+    after sleeping for delay seconds. The time of each request is kept in
+    'times', and the most concurrent requests in 'maxactive'. With 'etag' or
+    'lastmodified' set, the 200 answers have an ETag of the body or the given
+    Last-Modified header, and matching conditional requests get a 304 answer.
+    The headers of the conditional requests are kept in 'conditions'.
+    """
+
+    def __init__(self, responses, etag=False, lastmodified=None):
+        super().__init__(('127.0.0.1', 0), FakeAssemblaHandler)
+        self.responses = responses
+        self.etag = etag
+        self.lastmodified = lastmodified
+        self.conditions = []
+        self.requests = []
+        self.times = []
+        self.active = 0
+        self.maxactive = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def answer(self, path):
+        """ Return the next (status, body, delay) for path """
+        with self.lock:
+            self.requests.append(path)
+            self.times.append(time.monotonic())
+            answers = self.responses[path.split('?')[0]]
+            answer = answers[0] if len(answers) == 1 else answers.pop(0)
+        return (answer + (0, ))[:3]
+
+
+class FakeAssemblaHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.maxactive = max(server.maxactive, server.active)
+        try:
+            self.respond()
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def respond(self):
+        if self.headers['X-Api-Key'] != 'key' or self.headers['X-Api-Secret'] != 'secret':
+            status, body, delay = 401, None, 0
+        else:
+            status, body, delay = self.server.answer(self.path)
+        time.sleep(delay)
+        data = json.dumps(body).encode() if body is not None else b''
+        headers = {}
+        if status == 429:
+            headers['Retry-After'] = '0'
+        if status == 200 and self.server.etag:
+            headers['ETag'] = '"' + hashlib.sha1(data).hexdigest() + '"'
+        if status == 200 and self.server.lastmodified:
+            headers['Last-Modified'] = self.server.lastmodified
+        conditions = {k: self.headers[k] for k in ('If-None-Match', 'If-Modified-Since') if k in self.headers}
+        if conditions:
+            self.server.conditions.append(conditions)
+            etagmatch = 'ETag' in headers and conditions.get('If-None-Match') == headers['ETag']
+            datematch = 'Last-Modified' in headers and conditions.get('If-Modified-Since') == headers['Last-Modified']
+            if etagmatch or datematch:
+                status, data = 304, b''
+        try:
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except OSError:
+            # The client gave up waiting
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fakeassembla():
+    servers = []
+
+    def start(responses, **kwargs):
+        server = FakeAssembla(responses, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fastretries(monkeypatch):
+    monkeypatch.setattr(assembla2github, 'ASSEMBLA_API_BACKOFF', 0.01)
+    monkeypatch.setattr(assembla2github, 'ASSEMBLA_API_TIMEOUT', 0.5)
+
+
+AUTH = {'assembla_key': 'key', 'assembla_secret': 'secret'}
+
+
+def assemblaapi(server, rate=1000, **kwargs):
+    return assembla2github.AssemblaApi({'api_url': server.url}, AUTH, rate=rate, **kwargs)
+
+
+def userresponses(ids, failing=()):
+    """ Answers of the user requests. The first users answer last """
+    return {
+        f'/users/{uid}.json': [(503, None)] if uid in failing else [(200, {'id': uid}, 0.05 * (len(ids) - i))]
+        for i, uid in enumerate(ids)
+    }
+
+
+def test_get_retries_429_and_503(fakeassembla):
+    server = fakeassembla({'/spaces': [(429, None), (503, None), (200, [{'id': 1}])]})
+    req = assemblaapi(server).get('spaces')
+    assert req.status_code == 200
+    assert req.json() == [{'id': 1}]
+    assert len(server.requests) == 3
+
+
+def test_get_returns_last_error(fakeassembla, monkeypatch):
+    monkeypatch.setattr(assembla2github, 'ASSEMBLA_API_RETRIES', 2)
+    server = fakeassembla({'/spaces': [(503, None)]})
+    req = assemblaapi(server).get('spaces')
+    assert req.status_code == 503
+    assert len(server.requests) == 3
+
+
+def test_get_retries_timeout(fakeassembla):
+    server = fakeassembla({'/spaces': [(200, [{'id': 1}], 2), (200, [{'id': 2}])]})
+    req = assemblaapi(server).get('spaces')
+    assert req.json() == [{'id': 2}]
+    assert len(server.requests) == 2
+
+
+def test_get_raises_timeout(fakeassembla, monkeypatch):
+    monkeypatch.setattr(assembla2github, 'ASSEMBLA_API_RETRIES', 1)
+    server = fakeassembla({'/spaces': [(200, [], 2), (200, [], 2), (200, [])]})
+    with pytest.raises(assembla2github.requests.Timeout):
+        assemblaapi(server).get('spaces')
+    assert len(server.requests) == 2
+
+
+def test_getall_pages(fakeassembla):
+    server = fakeassembla({'/spaces/s/users': [
+        (200, [{'id': 1}, {'id': 2}]),
+        (503, None),
+        (200, [{'id': 3}]),
+        (200, []),
+    ]})
+    users = assemblaapi(server).getall('spaces/s/users', per_page=2)
+    assert users == [{'id': 1}, {'id': 2}, {'id': 3}]
+    assert server.requests == [
+        '/spaces/s/users?per_page=2&page=1',
+        '/spaces/s/users?per_page=2&page=2',
+        '/spaces/s/users?per_page=2&page=2',
+        '/spaces/s/users?per_page=2&page=3',
+    ]
+
+
+def test_getall_capped_pages(fakeassembla):
+    """ A server returning fewer entries per page than requested """
+    server = fakeassembla({'/spaces/s/users': [
+        (200, [{'id': 1}, {'id': 2}]),
+        (200, [{'id': 3}, {'id': 4}]),
+        (200, [{'id': 5}]),
+        (200, []),
+    ]})
+    users = assemblaapi(server).getall('spaces/s/users', per_page=100)
+    assert users == [{'id': i} for i in range(1, 6)]
+    assert len(server.requests) == 4
+
+
+def test_getall_no_content(fakeassembla):
+    server = fakeassembla({'/spaces/s/users': [(200, [{'id': 1}]), (204, None)]})
+    assert assemblaapi(server).getall('spaces/s/users') == [{'id': 1}]
+
+
+def test_getall_fails(fakeassembla, monkeypatch):
+    monkeypatch.setattr(assembla2github, 'ASSEMBLA_API_RETRIES', 1)
+    server = fakeassembla({'/spaces/s/users': [(429, None)]})
+    assert assemblaapi(server).getall('spaces/s/users') is None
+
+
+def test_map_ordered(fakeassembla, monkeypatch):
+    monkeypatch.setattr(assembla2github, 'ASSEMBLA_API_RETRIES', 1)
+    ids = [f'u{i}' for i in range(8)]
+    server = fakeassembla(userresponses(ids, failing={'u2', 'u5'}))
+    api = assemblaapi(server, workers=3)
+
+    def fetch(uid):
+        req = api.get(f'users/{uid}.json')
+        return req.json() if req.status_code == 200 else req.status_code
+
+    results = list(api.map(fetch, ids))
+    assert results == [503 if uid in ('u2', 'u5') else {'id': uid} for uid in ids]
+    assert server.maxactive <= 3
+    # Two requests for each failing user
+    assert len(server.requests) == len(ids) + 2
+
+
+def test_map_rate_limit(fakeassembla):
+    ids = [f'u{i}' for i in range(10)]
+    server = fakeassembla({f'/users/{uid}.json': [(200, {'id': uid})] for uid in ids})
+    api = assemblaapi(server, rate=20, workers=4)
+    results = list(api.map(lambda uid: api.get(f'users/{uid}.json').json(), ids))
+    assert results == [{'id': uid} for uid in ids]
+    # One request at once, then 20 per second
+    times = sorted(server.times)
+    assert times[-1] - times[0] >= (len(ids) - 1) / 20 * 0.9
+
+
+def test_userscrape_failures(fakeassembla, monkeypatch, tmp_path, caplog):
+    monkeypatch.setattr(assembla2github, 'ASSEMBLA_API_RETRIES', 1)
+    ids = [f'u{i}' for i in range(6)]
+    server = fakeassembla(userresponses(ids, failing={'u1', 'u4'}))
+    data = assembla2github.DictPlus({
+        '_index': {'_users': {uid: {'id': uid} for uid in ids}},
+        'spaces': [{'id': 's'}],
+    })
+    options = argparse.Namespace(out=str(tmp_path / 'users.json'), workers=3, rate=1000, no_http_cache=True,
+                                 space_members=False)
+    with caplog.at_level(logging.INFO):
+        assembla2github.cmd_userscrape(argparse.ArgumentParser(), options, {'api_url': server.url}, AUTH, data)
+
+    with open(tmp_path / 'users.json') as f:
+        assert json.load(f) == [{'id': uid} for uid in ids if uid not in ('u1', 'u4')]
+    errors = [r.getMessage() for r in caplog.records if r.levelno == logging.ERROR]
+    assert errors[-3:] == [
+        "Failed to fetch 2 users:",
+        "    u1: Error code 503",
+        "    u4: Error code 503",
+    ]
+
+
+def test_cache_etag(fakeassembla, tmp_path):
+    server = fakeassembla({'/users/u1.json': [(200, {'id': 'u1'})]}, etag=True)
+    api = assemblaapi(server, cache=tmp_path)
+    assert api.get('users/u1.json').json() == {'id': 'u1'}
+    assert api.stats == {'misses': 1}
+
+    # The next scrape revalidates the cached response
+    api = assemblaapi(server, cache=tmp_path)
+    req = api.get('users/u1.json')
+    assert req.status_code == 200
+    assert req.json() == {'id': 'u1'}
+    assert api.stats == {'hits': 1}
+    assert server.conditions == [{'If-None-Match': '"' + hashlib.sha1(b'{"id": "u1"}').hexdigest() + '"'}]
+
+
+def test_cache_etag_changed(fakeassembla, tmp_path):
+    server = fakeassembla({'/users/u1.json': [(200, {'id': 'u1'}), (200, {'id': 'u1', 'name': 'New'})]}, etag=True)
+    api = assemblaapi(server, cache=tmp_path)
+    api.get('users/u1.json')
+    assert api.get('users/u1.json').json() == {'id': 'u1', 'name': 'New'}
+    assert api.get('users/u1.json').json() == {'id': 'u1', 'name': 'New'}
+    assert api.stats == {'misses': 2, 'hits': 1}
+    assert len(server.conditions) == 2
+
+
+def test_cache_last_modified(fakeassembla, tmp_path):
+    lastmodified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    server = fakeassembla({'/users/u1.json': [(200, {'id': 'u1'})]}, lastmodified=lastmodified)
+    assemblaapi(server, cache=tmp_path).get('users/u1.json')
+    api = assemblaapi(server, cache=tmp_path)
+    assert api.get('users/u1.json').json() == {'id': 'u1'}
+    assert api.stats == {'hits': 1}
+    assert server.conditions == [{'If-Modified-Since': lastmodified}]
+
+
+def test_cache_not_stored(fakeassembla, tmp_path):
+    """ Responses without ETag or Last-Modified, and failed responses, are not cached """
+    server = fakeassembla({'/users/u1.json': [(200, {'id': 'u1'})], '/users/u2.json': [(404, None)]}, etag=True)
+    api = assemblaapi(server, cache=tmp_path / 'cache')
+    api.get('users/u2.json')
+    server.etag = False
+    api.get('users/u1.json')
+    assert api.stats == {'misses': 2}
+    assert list((tmp_path / 'cache').iterdir()) == []
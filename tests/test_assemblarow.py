@@ -0,0 +1,40 @@
+"""
+Tests of the lazy RELATIONS fields of AssemblaRow
+"""
+import pytest
+
+import assembla2github
+
+
+def ticket(data, **values):
+    fields = ('id', 'number', 'state', 'completed_date', 'ticket_status_id')
+    row = assembla2github.AssemblaRow(assembla2github.rowlayout('tickets', fields), [values.get(k) for k in fields])
+    data.bindrelations()
+    return row
+
+
+@pytest.fixture
+def data():
+    data = assembla2github.DictPlus({
+        '_index': {'ticket_statuses': {1: {'id': 1, 'name': 'New'}}},
+        '_groups': {'workflow_property_vals': {'workflow_instance_id': {}}},
+    })
+    return data
+
+
+def test_missing_value(data):
+    row = ticket(data, id=1, number=1, state=1, ticket_status_id=1)
+    assert row.get('_completed_date') is None
+    assert '_completed_date' not in row
+    with pytest.raises(KeyError):
+        row['_completed_date']
+    assert row.get('_keywords', set()) == set()
+    assert row['_status'] == 'New'
+
+
+def test_missing_reference(data):
+    """ References to missing rows are errors, also with get() """
+    row = ticket(data, id=1, number=1, state=1, ticket_status_id=2)
+    with pytest.raises(KeyError) as excinfo:
+        row.get('_status')
+    assert not isinstance(excinfo.value, assembla2github.MissingValue)
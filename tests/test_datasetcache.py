@@ -0,0 +1,31 @@
+"""
+Tests of the parsed dataset cache
+"""
+import logging
+
+import assembla2github
+
+
+def test_datasetcache_replays_warnings(tmp_path, caplog):
+    filename = tmp_path / 'dataset.pickle'
+    data = assembla2github.DictPlus(spaces=[{'name': 'space'}])
+    with assembla2github.LogCapture() as capture:
+        logging.info("Parsing")
+        logging.error("line #2: Unexpected syntax")
+        logging.warning("Missing user data for ['dummy']")
+    assembla2github.savedatasetcache(filename, 'key', data, capture.records)
+
+    caplog.clear()
+    with caplog.at_level(logging.INFO):
+        assert assembla2github.loaddatasetcache(filename, 'key') == data
+    assert [(r.levelno, r.getMessage()) for r in caplog.records][1:] == [
+        (logging.ERROR, "line #2: Unexpected syntax"),
+        (logging.WARNING, "Missing user data for ['dummy']"),
+    ]
+
+
+def test_datasetcache_outdated(tmp_path):
+    filename = tmp_path / 'dataset.pickle'
+    assembla2github.savedatasetcache(filename, 'key', assembla2github.DictPlus())
+    assert assembla2github.loaddatasetcache(filename, 'other') is None
+    assert assembla2github.loaddatasetcache(tmp_path / 'missing.pickle', 'key') is None
@@ -0,0 +1,29 @@
+"""
+Tests of LogCapture
+"""
+import logging
+import threading
+
+import assembla2github
+
+
+def test_logcapture_current_thread():
+    started = threading.Event()
+    stop = threading.Event()
+
+    def uploader():
+        # Log from another thread while the main thread captures
+        logging.warning("Uploading ticket #1")
+        started.set()
+        stop.wait(5)
+        logging.warning("Uploading ticket #2")
+
+    with assembla2github.LogCapture() as capture:
+        thread = threading.Thread(target=uploader)
+        thread.start()
+        started.wait(5)
+        logging.warning("Ticket #3: Unparseable link")
+        stop.set()
+        thread.join()
+
+    assert [record.getMessage() for record in capture.records] == ["Ticket #3: Unparseable link"]
@@ -0,0 +1,85 @@
+"""
+Golden output tests of the markdown conversion. Each tests/markdown/MODE/NAME.txt
+is an Assembla text, and NAME.md is its expected markdown conversion in MODE.
+"""
+import logging
+import pathlib
+import signal
+import time
+
+import pytest
+
+import assembla2github
+
+
+CORPUS = pathlib.Path(__file__).parent / 'markdown'
+
+# migratetexttomd() arguments of each mode: wikiconvert, ticketsconvert, and
+# ticket texts with @quote@ conversion
+MODES = {
+    'wiki': dict(is_wiki=True, migrate_at=True),
+    'ticket': dict(is_wiki=False, migrate_at=False),
+    'ticket_at': dict(is_wiki=False, migrate_at=True),
+}
+
+WIKIPAGES = {'Home', 'Installation_Guide'}
+
+DOCUMENTS = {
+    'abc123': {'filename': 'manual.pdf'},
+    'def456': {'filename': 'picture.png'},
+}
+
+URLREWRITER = assembla2github.UrlRewriter('myspace', 'https://github.com/me/repo')
+
+
+def readtext(path):
+    """ Read the file without newline translation """
+    with open(path, encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+def corpus():
+    return sorted(CORPUS.glob('*/*.txt'))
+
+
+@pytest.mark.parametrize('path', corpus(), ids=lambda p: f'{p.parent.name}/{p.stem}')
+def test_migratetexttomd(path):
+    result = assembla2github.migratetexttomd(
+        readtext(path), path.stem, wikipages=WIKIPAGES, documents=DOCUMENTS, urlrewriter=URLREWRITER,
+        budget=None, **MODES[path.parent.name])
+    assert result == readtext(path.with_suffix('.md'))
+
+
+@pytest.mark.parametrize('path', corpus(), ids=lambda p: f'{p.parent.name}/{p.stem}')
+def test_migratetexttomd_stats(path):
+    """ Collecting the rule statistics does not change the conversion """
+    stats = assembla2github.RuleStats()
+    result = assembla2github.migratetexttomd(
+        readtext(path), path.stem, wikipages=WIKIPAGES, documents=DOCUMENTS, urlrewriter=URLREWRITER,
+        stats=stats, budget=None, **MODES[path.parent.name])
+    assert result == readtext(path.with_suffix('.md'))
+
+
+class SlowStream:
+    """ Log stream slower than the conversion time budget """
+
+    def write(self, text):
+        time.sleep(0.5)
+
+    def flush(self):
+        pass
+
+
+@pytest.mark.skipif(not hasattr(signal, 'setitimer'), reason="Needs SIGALRM")
+def test_texttomd_timeout_in_warning(capsys):
+    """ The time budget expiring while logging a warning falls back to simpletexttomd() """
+    handler = logging.StreamHandler(SlowStream())
+    logging.getLogger().addHandler(handler)
+    try:
+        text = '# Item\n[[Unknown]] ' * 3
+        result, timedout = assembla2github.texttomd(text + '\n', 'slow', wikipages=WIKIPAGES, budget=0.2)
+    finally:
+        logging.getLogger().removeHandler(handler)
+    assert timedout
+    assert result == assembla2github.simpletexttomd(text + '\n')
+    assert 'Logging error' not in capsys.readouterr().err